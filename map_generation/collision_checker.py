@@ -0,0 +1,505 @@
+import fcl
+import numpy as np
+import logging
+from .collision_detection import add_transform, create_sphere, create_capsule
+
+# Upper bound on the number of (point, obstacle) pairs evaluated in one NumPy pass.
+MAX_PAIRS_PER_CHUNK = 2_000_000
+# Scenes with fewer cube obstacles than this are tested without the broad phase.
+BROAD_PHASE_MIN_OBSTACLES = 32
+# Upper bound on the number of cells of an obstacle grid.
+MAX_GRID_CELLS = 1 << 21
+# Number of points or segments looked up in an obstacle grid at once.
+GRID_QUERY_CHUNK = 100_000
+
+
+def cube_bounds(obstacle_data):
+    """
+    Convert cube obstacles into axis-aligned bounding boxes.
+
+    :param obstacle_data: Sequence of (center_x, center_y, center_z, side_length) cubes.
+    :return: Tuple of (M, 3) arrays holding the minimum and maximum corner of each cube.
+    """
+    data = np.asarray(obstacle_data, dtype=float).reshape(-1, 4)
+    centers = data[:, :3]
+    half_sides = 0.5 * data[:, 3:4]
+    return centers - half_sides, centers + half_sides
+
+
+def spheres_collide_with_boxes(points, radius, box_min, box_max):
+    """
+    Test N spheres of equal radius against M axis-aligned boxes at once.
+
+    A sphere collides with a box when the closest point of the box to the sphere
+    centre lies within the sphere, touching included (this matches FCL).
+
+    :param points: (N, 3) array of sphere centres.
+    :param radius: Radius shared by all spheres.
+    :param box_min: (M, 3) array of minimum box corners.
+    :param box_max: (M, 3) array of maximum box corners.
+    :return: Boolean array of shape (N,), True where the sphere hits any box.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    collisions = np.zeros(len(points), dtype=bool)
+    if len(box_min) == 0 or len(points) == 0:
+        return collisions
+
+    radius_sq = radius * radius
+    chunk = max(1, MAX_PAIRS_PER_CHUNK // len(box_min))
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk, None, :]
+        closest = np.clip(block, box_min[None, :, :], box_max[None, :, :])
+        dist_sq = np.sum((block - closest) ** 2, axis=2)
+        collisions[start:start + chunk] = np.any(dist_sq <= radius_sq, axis=1)
+    return collisions
+
+
+def _segment_box_distance_sq(starts, directions, box_min, box_max):
+    """
+    Exact squared distance between segments and axis-aligned boxes, pair by pair.
+
+    The box planes split the segment parameter range [0, 1] into at most seven
+    intervals. Inside one interval every axis stays below, inside or above the box,
+    so the squared distance is a single quadratic whose minimum is found in closed form.
+
+    :param starts: (K, 3) array of segment start points.
+    :param directions: (K, 3) array of segment vectors (end - start).
+    :param box_min: (K, 3) array of minimum box corners.
+    :param box_max: (K, 3) array of maximum box corners.
+    :return: Array of shape (K,) with the squared segment-to-box distances.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plane_t = (np.stack((box_min, box_max), axis=1) - starts[:, None, :]) / directions[:, None, :]
+    plane_t = np.clip(np.nan_to_num(plane_t.reshape(-1, 6), nan=0.0, posinf=1.0, neginf=0.0), 0.0, 1.0)
+
+    breakpoints = np.sort(np.concatenate((np.zeros((len(starts), 1)), np.ones((len(starts), 1)), plane_t), axis=1),
+                          axis=1)
+    t_lo, t_hi = breakpoints[:, :-1], breakpoints[:, 1:]
+
+    mid_points = starts[:, None, :] + (0.5 * (t_lo + t_hi))[:, :, None] * directions[:, None, :]
+    below = mid_points < box_min[:, None, :]
+    above = mid_points > box_max[:, None, :]
+    bound = np.where(below, box_min[:, None, :], box_max[:, None, :])
+    outside = below | above
+
+    quad_a = np.sum(np.where(outside, directions[:, None, :] ** 2, 0.0), axis=2)
+    quad_b = np.sum(np.where(outside, directions[:, None, :] * (starts[:, None, :] - bound), 0.0), axis=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_min = np.where(quad_a > 0, -quad_b / quad_a, t_lo)
+    t_min = np.clip(t_min, t_lo, t_hi)
+
+    closest_on_segment = starts[:, None, :] + t_min[:, :, None] * directions[:, None, :]
+    closest_on_box = np.clip(closest_on_segment, box_min[:, None, :], box_max[:, None, :])
+    return np.min(np.sum((closest_on_segment - closest_on_box) ** 2, axis=2), axis=1)
+
+
+def _segment_box_pairs_collide(starts, directions, radius, box_min, box_max):
+    """
+    Test aligned pairs of capsules and boxes: pair k is segment k against box k.
+
+    A slab test against the box inflated by the radius rejects most pairs; the
+    remaining pairs get the exact segment-to-box distance, which handles the rounded
+    edges and corners of the inflated box.
+
+    :param starts: (K, 3) array of segment start points.
+    :param directions: (K, 3) array of segment vectors (end - start).
+    :param radius: Radius of the swept sphere.
+    :param box_min: (K, 3) array of minimum box corners.
+    :param box_max: (K, 3) array of maximum box corners.
+    :return: Boolean array of shape (K,), True where the capsule hits the box.
+    """
+    inflated_min = box_min - radius
+    inflated_max = box_max + radius
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (inflated_min - starts) / directions
+        t2 = (inflated_max - starts) / directions
+    parallel = directions == 0
+    inside_slab = (starts >= inflated_min) & (starts <= inflated_max)
+    t_near = np.where(parallel, np.where(inside_slab, -np.inf, np.inf), np.minimum(t1, t2))
+    t_far = np.where(parallel, np.where(inside_slab, np.inf, -np.inf), np.maximum(t1, t2))
+    t_enter = np.max(t_near, axis=1)
+    t_exit = np.min(t_far, axis=1)
+    slab_hit = np.flatnonzero((t_enter <= t_exit) & (t_exit >= 0.0) & (t_enter <= 1.0))
+
+    collisions = np.zeros(len(starts), dtype=bool)
+    if len(slab_hit):
+        dist_sq = _segment_box_distance_sq(starts[slab_hit], directions[slab_hit],
+                                           box_min[slab_hit], box_max[slab_hit])
+        collisions[slab_hit] = dist_sq <= radius * radius
+    return collisions
+
+
+def segments_collide_with_boxes(starts, ends, radius, box_min, box_max):
+    """
+    Test E capsules (swept spheres along segments) against M axis-aligned boxes.
+
+    :param starts: (E, 3) array of segment start points.
+    :param ends: (E, 3) array of segment end points.
+    :param radius: Radius of the swept sphere.
+    :param box_min: (M, 3) array of minimum box corners.
+    :param box_max: (M, 3) array of maximum box corners.
+    :return: Boolean array of shape (E,), True where the capsule hits any box.
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+    directions = np.asarray(ends, dtype=float).reshape(-1, 3) - starts
+    collisions = np.zeros(len(starts), dtype=bool)
+    if len(box_min) == 0 or len(starts) == 0:
+        return collisions
+
+    chunk = max(1, MAX_PAIRS_PER_CHUNK // len(box_min))
+    for start in range(0, len(starts), chunk):
+        count = len(starts[start:start + chunk])
+        seg_idx = np.repeat(np.arange(start, start + count), len(box_min))
+        box_idx = np.tile(np.arange(len(box_min)), count)
+        hits = _segment_box_pairs_collide(starts[seg_idx], directions[seg_idx], radius,
+                                          box_min[box_idx], box_max[box_idx])
+        collisions[seg_idx[hits]] = True
+    return collisions
+
+
+def _expand_cell_ranges(lo, hi):
+    """
+    Enumerate the grid cells of many integer cell ranges at once.
+
+    :param lo: (K, 3) array of the lowest cell of each range.
+    :param hi: (K, 3) array of the highest cell of each range (inclusive).
+    :return: Owner range index and (C, 3) cell coordinates of every enumerated cell.
+    """
+    extent = hi - lo + 1
+    counts = np.prod(extent, axis=1)
+    owners = np.repeat(np.arange(len(lo)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    ny, nz = extent[owners, 1], extent[owners, 2]
+    cells = np.stack((local // (ny * nz), (local // nz) % ny, local % nz), axis=1) + lo[owners]
+    return owners, cells
+
+
+class ObstacleGrid:
+    """
+    Uniform-grid broad phase over axis-aligned obstacle boxes.
+
+    Every box, inflated by a padding (the robot radius), is registered in all grid
+    cells it overlaps, stored in CSR form (cell_start / box_ids). A query only has
+    to narrow-phase-test the boxes registered in the cells it touches.
+
+    Attributes:
+        origin (np.ndarray): Lower corner of the grid.
+        cell_size (float): Edge length of a grid cell.
+        shape (np.ndarray): Number of cells along each axis.
+        cell_start (np.ndarray): CSR row pointer, one entry per cell plus one.
+        box_ids (np.ndarray): Box indices of all cells, concatenated.
+    """
+
+    def __init__(self, box_min, box_max, padding):
+        """
+        Build the grid.
+
+        :param box_min: (M, 3) array of minimum box corners.
+        :param box_max: (M, 3) array of maximum box corners.
+        :param padding: Distance by which every box is inflated before registration.
+        """
+        self.num_boxes = len(box_min)
+        inflated_min = box_min - padding
+        inflated_max = box_max + padding
+        self.origin = inflated_min.min(axis=0)
+        extent = inflated_max.max(axis=0) - self.origin
+
+        self.cell_size = max(float(np.median(np.max(inflated_max - inflated_min, axis=1))), 1e-9)
+        while np.prod(np.ceil(extent / self.cell_size) + 1) > MAX_GRID_CELLS:
+            self.cell_size *= 2.0
+        self.shape = (np.floor(extent / self.cell_size) + 1).astype(np.int64)
+
+        owners, cells = _expand_cell_ranges(self._cells_of(inflated_min), self._cells_of(inflated_max))
+        flat_cells = np.ravel_multi_index(cells.T, self.shape)
+        order = np.argsort(flat_cells, kind='stable')
+        self.box_ids = owners[order]
+        self.cell_start = np.concatenate(([0], np.cumsum(np.bincount(flat_cells, minlength=np.prod(self.shape)))))
+
+    def _cells_of(self, points):
+        cells = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, self.shape - 1)
+
+    def _lookup(self, owners, cells):
+        """
+        Gather the boxes registered in the given cells.
+
+        :param owners: Query index of every cell.
+        :param cells: (C, 3) array of cell coordinates.
+        :return: Query indices and box indices of all candidate pairs.
+        """
+        flat_cells = np.ravel_multi_index(cells.T, self.shape)
+        starts = self.cell_start[flat_cells]
+        counts = self.cell_start[flat_cells + 1] - starts
+        pair_owners = np.repeat(owners, counts)
+        positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+        return pair_owners, self.box_ids[positions]
+
+    def point_candidates(self, points):
+        """
+        Candidate (point, box) pairs for sphere queries.
+
+        :param points: (N, 3) array of sphere centres.
+        :return: Point indices and box indices of the candidate pairs.
+        """
+        inside = np.all((points >= self.origin) & (points < self.origin + self.shape * self.cell_size), axis=1)
+        owners = np.flatnonzero(inside)
+        return self._lookup(owners, self._cells_of(points[owners]))
+
+    def segment_candidates(self, starts, ends):
+        """
+        Candidate (segment, box) pairs for swept-sphere queries, without duplicates.
+
+        :param starts: (E, 3) array of segment start points.
+        :param ends: (E, 3) array of segment end points.
+        :return: Segment indices and box indices of the candidate pairs.
+        """
+        lower = np.minimum(starts, ends)
+        upper = np.maximum(starts, ends)
+        overlaps = np.all((upper >= self.origin) & (lower < self.origin + self.shape * self.cell_size), axis=1)
+        segments = np.flatnonzero(overlaps)
+        range_owners, cells = _expand_cell_ranges(self._cells_of(lower[segments]), self._cells_of(upper[segments]))
+        pair_owners, pair_boxes = self._lookup(segments[range_owners], cells)
+
+        keys = np.unique(pair_owners * self.num_boxes + pair_boxes)
+        return keys // self.num_boxes, keys % self.num_boxes
+
+
+def _rotation_from_z(direction):
+    """
+    Rotation matrix that maps the Z axis onto the given direction (Rodrigues' formula).
+
+    :param direction: Target direction (3D vector, need not be normalised).
+    :return: 3x3 rotation matrix.
+    """
+    length = np.linalg.norm(direction)
+    if length == 0:
+        return np.eye(3)
+    direction = direction / length
+    axis = np.cross([0.0, 0.0, 1.0], direction)
+    sin_angle = np.linalg.norm(axis)
+    cos_angle = direction[2]
+    if sin_angle < 1e-12:
+        return np.eye(3) if cos_angle > 0 else np.diag([1.0, -1.0, -1.0])
+    axis = axis / sin_angle
+    skew = np.array([[0.0, -axis[2], axis[1]],
+                     [axis[2], 0.0, -axis[0]],
+                     [-axis[1], axis[0], 0.0]])
+    return np.eye(3) + sin_angle * skew + (1 - cos_angle) * skew @ skew
+
+
+class CollisionChecker:
+    """
+    Collision queries of spherical robots against the obstacles of a scene.
+
+    Cube obstacles are tested with a vectorized closest-point-on-AABB kernel when the
+    'numpy' backend is selected. Obstacles without cube data, and every obstacle when
+    the 'fcl' backend is selected, are tested with FCL.
+
+    Both paths have a broad phase built once per scene: a uniform ObstacleGrid over
+    the cubes (one per robot radius, built on first use) and an FCL dynamic AABB tree
+    over the FCL obstacles, so a query only narrow-phase-tests nearby obstacles.
+
+    Attributes:
+        obstacles (list): FCL CollisionObject instances of the scene.
+        backend (str): Name of the collision backend ('numpy' or 'fcl').
+        box_min (np.ndarray): (M, 3) minimum corners of the cubes handled by NumPy.
+        box_max (np.ndarray): (M, 3) maximum corners of the cubes handled by NumPy.
+        fcl_obstacles (list): Obstacles that are checked through FCL.
+        fcl_manager (fcl.DynamicAABBTreeCollisionManager): Broad phase over fcl_obstacles.
+    """
+
+    BACKENDS = ('numpy', 'fcl')
+
+    def __init__(self, obstacles, obstacle_data=None, backend='numpy'):
+        """
+        Initialize the checker for a scene.
+
+        :param obstacles: List of FCL CollisionObject instances representing obstacles.
+        :param obstacle_data: Cube (center_x, center_y, center_z, side_length) for each entry of
+                              obstacles, or None for an obstacle that is not an axis-aligned cube.
+        :param backend: 'numpy' for the vectorized kernel, 'fcl' to check everything with FCL.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown collision backend '{backend}', expected one of {self.BACKENDS}.")
+
+        self.obstacles = list(obstacles)
+        self.backend = backend
+
+        if obstacle_data is None:
+            obstacle_data = [None] * len(self.obstacles)
+        if len(obstacle_data) != len(self.obstacles):
+            raise ValueError("obstacle_data must describe every obstacle of the scene.")
+
+        cubes = []
+        self.fcl_obstacles = []
+        for obstacle, cube in zip(self.obstacles, obstacle_data):
+            if backend == 'numpy' and cube is not None:
+                cubes.append(cube)
+            else:
+                self.fcl_obstacles.append(obstacle)
+
+        self.box_min, self.box_max = cube_bounds(cubes)
+        self._grids = {}
+
+        self.fcl_manager = fcl.DynamicAABBTreeCollisionManager()
+        if self.fcl_obstacles:
+            self.fcl_manager.registerObjects(self.fcl_obstacles)
+            self.fcl_manager.setup()
+
+        logging.debug(f"Collision checker uses NumPy for {len(cubes)} and FCL for "
+                      f"{len(self.fcl_obstacles)} obstacles.")
+
+    @classmethod
+    def from_bounds(cls, box_min, box_max):
+        """
+        Create a NumPy checker directly from box corners, without FCL objects.
+
+        :param box_min: (M, 3) array of minimum box corners.
+        :param box_max: (M, 3) array of maximum box corners.
+        :return: CollisionChecker over the boxes.
+        """
+        checker = cls([], backend='numpy')
+        checker.box_min = np.asarray(box_min, dtype=float).reshape(-1, 3)
+        checker.box_max = np.asarray(box_max, dtype=float).reshape(-1, 3)
+        return checker
+
+    def obstacle_grid(self, radius):
+        """
+        Broad-phase grid over the cube obstacles for a robot radius, or None for small scenes.
+
+        :param radius: Robot radius the boxes are inflated by.
+        :return: ObstacleGrid instance or None.
+        """
+        if len(self.box_min) < BROAD_PHASE_MIN_OBSTACLES:
+            return None
+        if radius not in self._grids:
+            self._grids[radius] = ObstacleGrid(self.box_min, self.box_max, radius)
+        return self._grids[radius]
+
+    def _fcl_collides(self, collision_object):
+        """
+        Check an FCL object against the FCL obstacles through the broad-phase manager.
+
+        :param collision_object: FCL CollisionObject of the robot.
+        :return: True if the object hits any FCL obstacle.
+        """
+        collision_data = fcl.CollisionData()
+        self.fcl_manager.collide(collision_object, collision_data, fcl.defaultCollisionCallback)
+        return collision_data.result.is_collision
+
+    def _fcl_point_collides(self, point, radius):
+        """
+        Check a single sphere against the FCL obstacles.
+
+        :param point: Sphere centre (3D coordinates).
+        :param radius: Sphere radius.
+        :return: True if the sphere hits any FCL obstacle.
+        """
+        sphere_w_tf = add_transform(create_sphere(radius), translation=np.asarray(point, dtype=float))
+        return self._fcl_collides(sphere_w_tf)
+
+    def _fcl_segment_collides(self, start, end, radius):
+        """
+        Check the capsule swept by a sphere moving from start to end against the FCL obstacles.
+
+        :param start: Start of the motion (3D coordinates).
+        :param end: End of the motion (3D coordinates).
+        :param radius: Sphere radius.
+        :return: True if the swept sphere hits any FCL obstacle.
+        """
+        start = np.asarray(start, dtype=float)
+        end = np.asarray(end, dtype=float)
+        direction = end - start
+        capsule = create_capsule(radius, np.linalg.norm(direction))
+        capsule_w_tf = add_transform(capsule, rotation=_rotation_from_z(direction), translation=0.5 * (start + end))
+        return self._fcl_collides(capsule_w_tf)
+
+    def collision_mask(self, points, radius):
+        """
+        Check a batch of robot positions against every obstacle.
+
+        :param points: (N, 3) array of robot positions.
+        :param radius: Robot radius.
+        :return: Boolean array of shape (N,), True where the position is in collision.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        grid = self.obstacle_grid(radius)
+        if grid is None:
+            collisions = spheres_collide_with_boxes(points, radius, self.box_min, self.box_max)
+        else:
+            collisions = np.zeros(len(points), dtype=bool)
+            for start in range(0, len(points), GRID_QUERY_CHUNK):
+                block = points[start:start + GRID_QUERY_CHUNK]
+                point_ids, box_ids = grid.point_candidates(block)
+                block_points = block[point_ids]
+                closest = np.clip(block_points, self.box_min[box_ids], self.box_max[box_ids])
+                hits = np.sum((block_points - closest) ** 2, axis=1) <= radius * radius
+                collisions[start + point_ids[hits]] = True
+
+        if self.fcl_obstacles:
+            for idx in np.flatnonzero(~collisions):
+                collisions[idx] = self._fcl_point_collides(points[idx], radius)
+        return collisions
+
+    def is_collision_free(self, point, radius):
+        """
+        Check whether a single robot position is free of collisions.
+
+        :param point: Robot position (3D coordinates).
+        :param radius: Robot radius.
+        :return: Boolean indicating if the position is collision-free.
+        """
+        return not self.collision_mask(point, radius)[0]
+
+    def segment_collision_mask(self, starts, ends, radius):
+        """
+        Check a batch of straight robot motions against every obstacle, without sampling.
+
+        :param starts: (E, 3) array of motion start points.
+        :param ends: (E, 3) array of motion end points.
+        :param radius: Robot radius.
+        :return: Boolean array of shape (E,), True where the motion is in collision.
+        """
+        starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+        grid = self.obstacle_grid(radius)
+        if grid is None:
+            collisions = segments_collide_with_boxes(starts, ends, radius, self.box_min, self.box_max)
+        else:
+            collisions = np.zeros(len(starts), dtype=bool)
+            for start in range(0, len(starts), GRID_QUERY_CHUNK):
+                block_starts = starts[start:start + GRID_QUERY_CHUNK]
+                block_ends = ends[start:start + GRID_QUERY_CHUNK]
+                segment_ids, box_ids = grid.segment_candidates(block_starts, block_ends)
+                hits = _segment_box_pairs_collide(block_starts[segment_ids],
+                                                  block_ends[segment_ids] - block_starts[segment_ids],
+                                                  radius, self.box_min[box_ids], self.box_max[box_ids])
+                collisions[start + segment_ids[hits]] = True
+
+        if self.fcl_obstacles:
+            for idx in np.flatnonzero(~collisions):
+                collisions[idx] = self._fcl_segment_collides(starts[idx], ends[idx], radius)
+        return collisions
+
+    def is_segment_collision_free(self, start, end, radius):
+        """
+        Check whether a straight robot motion is free of collisions.
+
+        :param start: Start of the motion (3D coordinates).
+        :param end: End of the motion (3D coordinates).
+        :param radius: Robot radius.
+        :return: Boolean indicating if the motion is collision-free.
+        """
+        return not self.segment_collision_mask(start, end, radius)[0]
+
+
+def as_collision_checker(obstacles):
+    """
+    Wrap a plain list of FCL obstacles in an FCL-backed CollisionChecker.
+
+    :param obstacles: CollisionChecker or list of FCL CollisionObject instances.
+    :return: CollisionChecker for the given obstacles.
+    """
+    if isinstance(obstacles, CollisionChecker):
+        return obstacles
+    return CollisionChecker(obstacles, backend='fcl')
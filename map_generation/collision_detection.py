@@ -1,8 +1,7 @@
 import fcl
 import numpy as np
-import open3d as o3d
 
-from scipy.spatial.transform import Rotation
+# open3d is imported inside the visualise* functions, so headless runs never load it.
 
 def visualise_box(box, translation=np.array([0, 0, 0]), rotation=np.eye(3)):
     """
@@ -12,6 +11,7 @@ def visualise_box(box, translation=np.array([0, 0, 0]), rotation=np.eye(3)):
     :param rotation: Rotation matrix for orienting the box.
     :return: Open3D TriangleMesh object representing the box.
     """
+    import open3d as o3d
     W, H, D = box.side
     mesh = o3d.geometry.TriangleMesh()
     box_mesh = mesh.create_box(W, H, D).translate(translation - 0.5 * np.array([W, H, D])).rotate(rotation)
@@ -24,6 +24,7 @@ def visualise_cylinder(cylinder, translation=np.array([0, 0, 0])):
     :param translation: Translation vector for positioning the cylinder.
     :return: Open3D TriangleMesh object representing the cylinder.
     """
+    import open3d as o3d
     radius, H = cylinder.radius, cylinder.lz
     mesh = o3d.geometry.TriangleMesh()
     cylinder_mesh = mesh.create_cylinder(radius, H).translate(translation)
@@ -36,6 +37,7 @@ def visualise_sphere(sphere, translation=np.array([0, 0, 0])):
     :param translation: Translation vector for positioning the sphere.
     :return: Open3D TriangleMesh object representing the sphere.
     """
+    import open3d as o3d
     radius = sphere.radius
     mesh = o3d.geometry.TriangleMesh()
     sphere_mesh = mesh.create_sphere(radius).translate(translation)
@@ -46,6 +48,7 @@ def visualise(*shapes):
     Visualize multiple shapes in a 3D space using Open3D.
     :param shapes: List of Open3D TriangleMesh objects.
     """
+    import open3d as o3d
     coordinate_frame = o3d.geometry.TriangleMesh().create_coordinate_frame()
     o3d.visualization.draw_geometries(list(shapes) + [coordinate_frame])
 
@@ -86,6 +89,15 @@ def create_sphere(r):
     """
     return fcl.Sphere(r)
 
+def create_capsule(r, l):
+    """
+    Create an FCL capsule shape along the Z axis.
+    :param r: Radius of the capsule.
+    :param l: Length of the capsule's central segment.
+    :return: FCL Capsule object.
+    """
+    return fcl.Capsule(r, l)
+
 def add_transform(shape, rotation=None, translation=None):
     """
     Add a transformation (rotation and/or translation) to a shape.
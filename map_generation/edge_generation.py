@@ -1,8 +1,49 @@
 import numpy as np
 import logging
-from .collision_detection import add_transform, check_collision, create_sphere
+from concurrent.futures import ProcessPoolExecutor
+from .collision_checker import CollisionChecker, as_collision_checker
+from .neighbour_index import create_neighbour_index
+from .shared_arrays import share_array, attach_array, release_arrays
 from .utils import load_config, setup_logging
 
+# State of an edge validation worker process, set up once by _init_edge_worker.
+_worker_state = {}
+
+
+def _init_edge_worker(array_specs, edge_validation, point_check_distance, max_radius):
+    """
+    Attach a worker process to the shared nodes, neighbours and obstacle boxes.
+
+    :param array_specs: Shared array specs of nodes, neighbours, box_min and box_max.
+    :param edge_validation: Edge validation mode ('batched' or 'exact').
+    :param point_check_distance: Distance between each point to be checked along an edge.
+    :param max_radius: Radius of the robot used for collision checking.
+    """
+    blocks, arrays = zip(*(attach_array(spec) for spec in array_specs))
+    nodes, neighbours, box_min, box_max = arrays
+    config = {'edge_validation': edge_validation, 'point_check_distance': point_check_distance}
+
+    _worker_state.update(blocks=blocks, nodes=nodes, neighbours=neighbours, max_radius=max_radius,
+                         checker=CollisionChecker.from_bounds(box_min, box_max),
+                         edge_gen=EdgeGenerator(config_file=None, config=config))
+
+
+def _validate_edge_shard(first_node, last_node):
+    """
+    Validate the candidate edges of the nodes first_node..last_node - 1 in a worker process.
+
+    :param first_node: First node index of the shard.
+    :param last_node: End (exclusive) of the node index range of the shard.
+    :return: List of collision-free edges (i, j).
+    """
+    state = _worker_state
+    edge_gen = state['edge_gen']
+    pairs = edge_gen.candidate_pairs(state['neighbours'][first_node:last_node], first_node)
+
+    valid = edge_gen.validate_pairs(state['nodes'], pairs, state['checker'], state['max_radius'])
+    return pairs[valid].tolist()
+
+
 class EdgeGenerator:
     """
     Class to generate edges between nodes in a map and ensure they are collision-free.
@@ -12,31 +53,24 @@ class EdgeGenerator:
         max_robot_radius (float): Maximum radius of the robot used for collision checking.
     """
 
-    def __init__(self, config_file):
+    def __init__(self, config_file, config=None):
         """
         Initialize the EdgeGenerator with a configuration file and robot radius.
 
         :param config_file: Path to the configuration YAML file.
-        :param max_robot_radius: Maximum radius of the robot used for collision checking.
+        :param config: Already loaded configuration; config_file is not read when given.
         """
-        self.config = load_config(config_file)
+        self.config = config if config is not None else load_config(config_file)
 
     def check_node_collision(self, node, obstacles, max_robot_radius):
         """
         Check if a node collides with any obstacles.
 
         :param node: Coordinates of the node.
-        :param obstacles: List of FCL CollisionObject instances representing obstacles.
+        :param obstacles: CollisionChecker or list of FCL CollisionObject instances representing obstacles.
         :return: Boolean indicating if the node is collision-free.
         """
-        sphere = create_sphere(max_robot_radius)
-        sphere_w_tf = add_transform(sphere, translation=node)
-
-        for obstacle in obstacles:
-            collision_result = check_collision(obstacle, sphere_w_tf)
-            if collision_result.is_collision:
-                return False
-        return True
+        return as_collision_checker(obstacles).is_collision_free(node, max_robot_radius)
 
     def generate_points(self, node1, node2, distance):
         """
@@ -66,6 +100,9 @@ class EdgeGenerator:
         :param obstacles: List of FCL CollisionObject instances representing obstacles.
         :return: Boolean indicating if the path is collision-free.
         """
+        if self.config['edge_validation'] == 'exact':
+            return as_collision_checker(obstacles).is_segment_collision_free(node1, node2, max_robot_radius)
+
         points = self.generate_points(node1, node2, point_check_distance)
         
         for point in points:
@@ -81,10 +118,14 @@ class EdgeGenerator:
         :param obstacles: List of FCL CollisionObject instances representing obstacles.
         :return: List of edges where each edge is represented by a tuple of node indices.
         """
+        if self.config['edge_validation'] in ('batched', 'exact'):
+            return self.generate_edges_batched(nodes, obstacles, max_radius)
+
+        neighbours = self.nearest_neighbours(nodes)
         edges = []
         edges_pair = []
         for i in range(len(nodes)):
-            nearest_node_indices = self.get_nearest_nodes_brute(nodes[i], nodes, self.config['nearest_nodes'])
+            nearest_node_indices = neighbours[i]
             path_nodes_indices = []
             for nearest_node_index in nearest_node_indices:
                 
@@ -102,6 +143,208 @@ class EdgeGenerator:
         
         return edges, edges_pair
 
+    def generate_edges_batched(self, nodes, obstacles, max_radius):
+        """
+        Generate the same edges as generate_edges, validating all candidate edges in one collision pass.
+
+        With edge_validation set to 'exact', the candidate edges are checked as swept spheres
+        instead of at sample points.
+
+        :param nodes: List of nodes (3D coordinates as NumPy arrays).
+        :param obstacles: CollisionChecker or list of FCL CollisionObject instances representing obstacles.
+        :param max_radius: Radius of the robot used for collision checking.
+        :return: Per-node lists of connected node indices and the list of edge pairs.
+        """
+        nodes = np.asarray(nodes, dtype=float)
+        neighbours = self.nearest_neighbours(nodes)
+
+        pairs = self.candidate_pairs(neighbours)
+        if self.config['edge_workers'] > 1:
+            valid = self.validate_pairs_parallel(nodes, neighbours, pairs, obstacles, max_radius)
+        else:
+            valid = self.validate_pairs(nodes, pairs, obstacles, max_radius)
+        return self.assemble_edges(neighbours, pairs, valid)
+
+    def generate_candidate_edges(self, nodes):
+        """
+        Generate the candidate edges of generate_edges without collision-checking them, for Lazy PRM.
+
+        :param nodes: List of nodes (3D coordinates as NumPy arrays).
+        :return: Per-node lists of connected node indices and the list of edge pairs.
+        """
+        nodes = np.asarray(nodes, dtype=float)
+        neighbours = self.nearest_neighbours(nodes)
+        pairs = self.candidate_pairs(neighbours)
+        return self.assemble_edges(neighbours, pairs, np.ones(len(pairs), dtype=bool))
+
+    def validate_pairs(self, nodes, pairs, obstacles, max_radius):
+        """
+        Collision-check candidate edges with the configured edge validation mode.
+
+        :param nodes: (N, 3) array of nodes.
+        :param pairs: (E, 2) array of candidate edges (i, j).
+        :param obstacles: CollisionChecker or list of FCL CollisionObject instances representing obstacles.
+        :param max_radius: Radius of the robot used for collision checking.
+        :return: Boolean array of shape (E,), True where the edge is collision-free.
+        """
+        if self.config['edge_validation'] == 'exact':
+            return self.validate_edges_exact(nodes, pairs, obstacles, max_radius)
+        return self.validate_edges_batched(nodes, pairs, self.config['point_check_distance'],
+                                           obstacles, max_radius)
+
+    def validate_segments(self, starts, ends, obstacles, max_radius):
+        """
+        Collision-check straight motions between arbitrary points, including the end points.
+
+        :param starts: (M, 3) array of start points.
+        :param ends: (M, 3) array of end points.
+        :param obstacles: CollisionChecker or list of FCL CollisionObject instances representing obstacles.
+        :param max_radius: Radius of the robot used for collision checking.
+        :return: Boolean array of shape (M,), True where the motion is collision-free.
+        """
+        starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+        checker = as_collision_checker(obstacles)
+        if self.config['edge_validation'] == 'exact':
+            return ~checker.segment_collision_mask(starts, ends, max_radius)
+
+        # Edges (i, i + M) over the stacked points are sampled from each start towards its end.
+        pairs = np.column_stack((np.arange(len(ends)), np.arange(len(ends)) + len(ends)))
+        valid = self.validate_edges_batched(np.vstack((ends, starts)), pairs, self.config['point_check_distance'],
+                                            checker, max_radius)
+        return valid & ~checker.collision_mask(ends, max_radius)
+
+    def validate_pairs_parallel(self, nodes, neighbours, pairs, obstacles, max_radius):
+        """
+        Collision-check candidate edges on a process pool, sharding the nodes across the workers.
+
+        Nodes, neighbours and obstacle boxes are passed through shared memory. Each worker
+        returns the valid edges of its node range; the merged, deduplicated result is the
+        same as validate_pairs.
+
+        :param nodes: (N, 3) array of nodes.
+        :param neighbours: (N, k) array of nearest node indices of every node.
+        :param pairs: (E, 2) array of candidate edges as returned by candidate_pairs.
+        :param obstacles: CollisionChecker or list of FCL CollisionObject instances representing obstacles.
+        :param max_radius: Radius of the robot used for collision checking.
+        :return: Boolean array of shape (E,), True where the edge is collision-free.
+        """
+        checker = as_collision_checker(obstacles)
+        if checker.fcl_obstacles:
+            logging.warning("Parallel edge generation needs the numpy collision backend with cube obstacles; "
+                            "validating edges in a single process.")
+            return self.validate_pairs(nodes, pairs, obstacles, max_radius)
+
+        workers = self.config['edge_workers']
+        bounds = np.linspace(0, len(nodes), min(workers * 4, len(nodes)) + 1).astype(int)
+        blocks, specs = zip(*(share_array(array) for array in (nodes, neighbours, checker.box_min, checker.box_max)))
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_edge_worker,
+                                     initargs=(specs, self.config['edge_validation'],
+                                               self.config['point_check_distance'], max_radius)) as pool:
+                shards = pool.map(_validate_edge_shard, bounds[:-1], bounds[1:])
+                valid_pairs = {tuple(pair) for shard in shards for pair in shard}
+        finally:
+            release_arrays(blocks)
+
+        logging.info(f"Validated {len(pairs)} candidate edges on {workers} worker processes.")
+        return np.array([tuple(pair) in valid_pairs for pair in pairs.tolist()], dtype=bool)
+
+    def nearest_neighbours(self, nodes):
+        """
+        Find the nearest nodes of every node with the configured neighbour index.
+
+        :param nodes: List of nodes (3D coordinates as NumPy arrays).
+        :return: (N, k) integer array of nearest node indices, sorted by distance.
+        """
+        index = create_neighbour_index(nodes, self.config['neighbour_index'])
+        return index.knn_all(self.config['nearest_nodes'])
+
+    @staticmethod
+    def candidate_pairs(neighbours, first_node=0):
+        """
+        Collect the edges that generate_edges would collision-check, in the order it checks them.
+
+        An edge (i, j) is a candidate when j is one of the nearest nodes of i and j >= i;
+        neighbours with a smaller index reuse the result of the check done from their side.
+
+        :param neighbours: (N, k) array of nearest node indices of every node, sorted by distance.
+        :param first_node: Node index of the first row of neighbours, when only a range of nodes is given.
+        :return: (E, 2) integer array of candidate edges (i, j).
+        """
+        pairs = [(i, j) for i, nearest in enumerate(neighbours.tolist(), start=first_node) for j in nearest if j >= i]
+        return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+    def validate_edges_batched(self, nodes, pairs, point_check_distance, obstacles, max_radius):
+        """
+        Collision-check many edges at once with the same sample points as is_collision_free_path.
+
+        The sample points of all edges are stacked into one (P, 3) array; offsets[e] is the row
+        of the first sample of edge e, so the collision mask is reduced back per edge segment.
+
+        :param nodes: (N, 3) array of nodes.
+        :param pairs: (E, 2) array of edges (i, j), sampled from node j towards node i.
+        :param point_check_distance: Distance between each point to be checked along an edge.
+        :param obstacles: CollisionChecker or list of FCL CollisionObject instances representing obstacles.
+        :param max_radius: Radius of the robot used for collision checking.
+        :return: Boolean array of shape (E,), True where the edge is collision-free.
+        """
+        if len(pairs) == 0:
+            return np.zeros(0, dtype=bool)
+
+        starts = nodes[pairs[:, 1]]
+        direction = nodes[pairs[:, 0]] - starts
+        lengths = np.linalg.norm(direction, axis=1)
+        unit_direction = np.divide(direction, lengths[:, None],
+                                   out=np.zeros_like(direction), where=lengths[:, None] > 0)
+
+        counts = (lengths // point_check_distance).astype(np.int64)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        edge_ids = np.repeat(np.arange(len(pairs)), counts)
+        steps = np.arange(offsets[-1]) - offsets[edge_ids] + 1
+
+        points = starts[edge_ids] + (steps * point_check_distance)[:, None] * unit_direction[edge_ids]
+        collisions = as_collision_checker(obstacles).collision_mask(points, max_radius)
+
+        colliding_points = np.bincount(edge_ids, weights=collisions, minlength=len(pairs))
+        return colliding_points == 0
+
+    def validate_edges_exact(self, nodes, pairs, obstacles, max_radius):
+        """
+        Collision-check many edges at once as continuous motions, independent of their length.
+
+        :param nodes: (N, 3) array of nodes.
+        :param pairs: (E, 2) array of edges (i, j).
+        :param obstacles: CollisionChecker or list of FCL CollisionObject instances representing obstacles.
+        :param max_radius: Radius of the robot used for collision checking.
+        :return: Boolean array of shape (E,), True where the edge is collision-free.
+        """
+        if len(pairs) == 0:
+            return np.zeros(0, dtype=bool)
+
+        collisions = as_collision_checker(obstacles).segment_collision_mask(nodes[pairs[:, 1]], nodes[pairs[:, 0]],
+                                                                            max_radius)
+        return ~collisions
+
+    @staticmethod
+    def assemble_edges(neighbours, pairs, valid):
+        """
+        Build the generate_edges output from the validation result of the candidate edges.
+
+        :param neighbours: (N, k) array of nearest node indices of every node, sorted by distance.
+        :param pairs: (E, 2) array of candidate edges as returned by candidate_pairs.
+        :param valid: Boolean array of shape (E,), True where the candidate edge is collision-free.
+        :return: Per-node lists of connected node indices and the list of edge pairs.
+        """
+        edges_pair = [tuple(pair) for pair in pairs[valid].tolist()]
+        valid_pairs = set(edges_pair)
+
+        edges = []
+        for i, nearest in enumerate(neighbours.tolist()):
+            edges.append([j for j in nearest if (min(i, j), max(i, j)) in valid_pairs])
+
+        return edges, edges_pair
+
     def get_nearest_nodes_brute(self, node, nodes, k):
         """
         Find the k nearest nodes to the given node using a brute-force approach, excluding the node itself.
@@ -1,15 +1,36 @@
+import numpy as np
 from utils import load_config
 from .node_generation import NodeGenerator
 from .edge_generation import EdgeGenerator
+from .roadmap_cache import RoadmapCache
+from .roadmap import Roadmap
 
 
 class MapGenerator:
-    def __init__(self, config_file="config.yaml"):
-        self.config_data = load_config(config_file)
-        self.node_gen = NodeGenerator(config_file=config_file)
-        self.edge_gen = EdgeGenerator(config_file=config_file)
+    def __init__(self, config_file="config.yaml", config=None):
+        self.config_data = config if config is not None else load_config(config_file)
+        self.node_gen = NodeGenerator(config_file=None, config=self.config_data)
+        self.edge_gen = EdgeGenerator(config_file=None, config=self.config_data)
+
+        self.cache = None
+        if self.config_data['roadmap_cache_dir']:
+            self.cache = RoadmapCache(self.config_data['roadmap_cache_dir'],
+                                      self.config_data['roadmap_cache_max_mb'])
     
     def generate_map(self, obstacles, max_radius, obstacle_data):
+        cache_key = None
+        if self.cache is not None:
+            cache_key = RoadmapCache.make_key(obstacle_data, max_radius,
+                                              self.config_data['WORKSPACE_MIN'],
+                                              self.config_data['WORKSPACE_MAX'],
+                                              self.config_data)
+            cached = self.cache.load(cache_key)
+            if cached is not None:
+                return cached
+
+        if self.config_data['seed'] is not None:
+            np.random.seed(self.config_data['seed'])
+
         nodes = self.node_gen.generate_nodes(
             num_nodes=self.config_data['num_nodes'],
             obstacles=obstacles,
@@ -21,11 +42,23 @@ class MapGenerator:
        
         edges, edges_pair = self.generate_edges(nodes, obstacles, max_radius)
 
+        if cache_key is not None:
+            self.cache.store(cache_key, nodes, edges, edges_pair)
+
         return nodes, edges, edges_pair
 
     def generate_edges(self, nodes, obstacles, max_radius):
         
+        if self.config_data['lazy_prm']:
+            # Edges are collision-checked by the PRM search when a path uses them.
+            return self.edge_gen.generate_candidate_edges(nodes)
+
         edges = self.edge_gen.generate_edges(nodes, obstacles, max_radius)
         return edges
 
+    def save_roadmap(self, file_path, nodes, edges_pair):
+        # With lazy_prm the edges are unchecked candidates; the file says so.
+        roadmap = Roadmap.from_edge_pairs(nodes, edges_pair, unchecked=self.config_data['lazy_prm'])
+        roadmap.save(file_path)
+        return roadmap
 
@@ -0,0 +1,312 @@
+import numpy as np
+from collections import defaultdict
+
+# Upper bound on the number of query-to-point distances evaluated in one NumPy pass.
+MAX_DISTANCES_PER_CHUNK = 4_000_000
+
+
+class NeighbourIndex:
+    """
+    Base class for nearest-neighbour indices over a fixed set of 3D points.
+
+    Subclasses implement query and query_radius; knn_all builds on query.
+
+    Attributes:
+        points (np.ndarray): (N, 3) array of indexed points.
+    """
+
+    def __init__(self, points):
+        """
+        Initialize the index.
+
+        :param points: Points to index (anything convertible to an (N, 3) array).
+        """
+        self.points = np.asarray(points, dtype=float).reshape(-1, 3)
+
+    def __len__(self):
+        return len(self.points)
+
+    def query(self, queries, k):
+        """
+        Find the k nearest indexed points of every query point.
+
+        :param queries: (Q, 3) array of query points.
+        :param k: Number of neighbours to return.
+        :return: (Q, k) arrays of distances and point indices, sorted by distance.
+        """
+        raise NotImplementedError
+
+    def query_radius(self, queries, radius):
+        """
+        Find all indexed points within a radius of every query point.
+
+        :param queries: (Q, 3) array of query points.
+        :param radius: Search radius.
+        :return: List with one array of point indices per query point.
+        """
+        raise NotImplementedError
+
+    def knn_all(self, k):
+        """
+        Find the k nearest neighbours of every indexed point, excluding the point itself.
+
+        :param k: Number of neighbours to return (capped at N - 1).
+        :return: (N, k) integer array of neighbour indices, sorted by distance.
+        """
+        k = min(k, len(self.points) - 1)
+        if k <= 0:
+            return np.zeros((len(self.points), 0), dtype=np.int64)
+
+        _, indices = self.query(self.points, k + 1)
+        not_self = indices != np.arange(len(self.points))[:, None]
+        # Move the point itself to the end of its row without disturbing the distance order.
+        order = np.argsort(~not_self, axis=1, kind='stable')
+        return np.take_along_axis(indices, order, axis=1)[:, :k]
+
+
+class BruteForceIndex(NeighbourIndex):
+    """
+    Neighbour index that compares every query against every point, in chunks.
+    """
+
+    def _chunks(self, queries):
+        chunk = max(1, MAX_DISTANCES_PER_CHUNK // max(1, len(self.points)))
+        for start in range(0, len(queries), chunk):
+            block = queries[start:start + chunk]
+            yield start, block, np.linalg.norm(self.points[None, :, :] - block[:, None, :], axis=2)
+
+    def query(self, queries, k):
+        queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+        k = min(k, len(self.points))
+        distances = np.empty((len(queries), k))
+        indices = np.empty((len(queries), k), dtype=np.int64)
+
+        for start, block, block_distances in self._chunks(queries):
+            if k < len(self.points):
+                nearest = np.argpartition(block_distances, k - 1, axis=1)[:, :k]
+            else:
+                nearest = np.tile(np.arange(len(self.points)), (len(block), 1))
+            nearest_distances = np.take_along_axis(block_distances, nearest, axis=1)
+            order = np.argsort(nearest_distances, axis=1)
+            indices[start:start + len(block)] = np.take_along_axis(nearest, order, axis=1)
+            distances[start:start + len(block)] = np.take_along_axis(nearest_distances, order, axis=1)
+        return distances, indices
+
+    def query_radius(self, queries, radius):
+        queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+        results = []
+        for _, _, block_distances in self._chunks(queries):
+            results.extend(np.flatnonzero(row <= radius) for row in block_distances)
+        return results
+
+
+class KDTreeIndex(NeighbourIndex):
+    """
+    Neighbour index backed by a SciPy KD-tree.
+    """
+
+    def __init__(self, points):
+        # SciPy is only loaded when a KD-tree is actually built.
+        from scipy.spatial import cKDTree
+
+        super().__init__(points)
+        self.tree = cKDTree(self.points)
+
+    def query(self, queries, k):
+        queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+        k = min(k, len(self.points))
+        if k == 0:
+            return np.zeros((len(queries), 0)), np.zeros((len(queries), 0), dtype=np.int64)
+        distances, indices = self.tree.query(queries, k=k)
+        return distances.reshape(len(queries), k), indices.reshape(len(queries), k).astype(np.int64)
+
+    def query_radius(self, queries, radius):
+        queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+        return [np.asarray(row, dtype=np.int64) for row in self.tree.query_ball_point(queries, radius)]
+
+
+class GridIndex(NeighbourIndex):
+    """
+    Neighbour index backed by a uniform-grid spatial hash.
+
+    Points are bucketed by integer cell coordinates. Queries are answered cell by cell:
+    all query points of one cell share the candidates gathered from the surrounding
+    rings of cells, which grow until the k-th neighbour is provably found. Points can
+    be inserted one at a time, e.g. while sampling.
+
+    Attributes:
+        cell_size (float): Edge length of a grid cell.
+        cells (dict): Maps integer cell coordinates to lists of point indices.
+    """
+
+    def __init__(self, points, cell_size=None):
+        """
+        Initialize the grid.
+
+        :param points: Points to index (anything convertible to an (N, 3) array).
+        :param cell_size: Edge length of a grid cell; derived from the point density if None.
+        """
+        super().__init__(points)
+        if cell_size is None:
+            cell_size = self._default_cell_size(self.points)
+        self.cell_size = float(cell_size)
+        self.cells = defaultdict(list)
+
+        keys = self._cell_keys(self.points)
+        for index, key in enumerate(map(tuple, keys.tolist())):
+            self.cells[key].append(index)
+        # Bounding box of the occupied cells, kept up to date by insert.
+        self._lowest = keys.min(axis=0) if len(keys) else None
+        self._highest = keys.max(axis=0) if len(keys) else None
+
+    @property
+    def points(self):
+        return self._buffer[:self._size]
+
+    @points.setter
+    def points(self, points):
+        self._buffer = np.array(points, dtype=float).reshape(-1, 3)
+        self._size = len(self._buffer)
+
+    def insert(self, point):
+        """
+        Add a point to the index.
+
+        :param point: Point to add (3D coordinates).
+        :return: Index of the new point.
+        """
+        if self._size == len(self._buffer):
+            grown = np.empty((max(16, 2 * len(self._buffer)), 3))
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+
+        index = self._size
+        self._buffer[index] = point
+        self._size += 1
+        key = self._cell_keys(point)[0]
+        self.cells[tuple(key.tolist())].append(index)
+        if self._lowest is None:
+            self._lowest, self._highest = key.copy(), key.copy()
+        else:
+            np.minimum(self._lowest, key, out=self._lowest)
+            np.maximum(self._highest, key, out=self._highest)
+        return index
+
+    def has_point_within(self, point, radius):
+        """
+        Check whether any indexed point is closer than a radius to the given point.
+
+        :param point: Query point (3D coordinates).
+        :param radius: Distance below which an indexed point counts as near.
+        :return: Boolean indicating if a near point exists.
+        """
+        point = np.asarray(point, dtype=float)
+        ring = int(np.ceil(radius / self.cell_size))
+        candidates = self._gather(tuple(self._cell_keys(point)[0].tolist()), ring)
+        if len(candidates) == 0:
+            return False
+        return bool(np.any(np.linalg.norm(self._buffer[candidates] - point, axis=1) < radius))
+
+    @staticmethod
+    def _default_cell_size(points, points_per_cell=2.0):
+        if len(points) < 2:
+            return 1.0
+        extent = np.ptp(points, axis=0)
+        volume = np.prod(np.maximum(extent, 1e-9))
+        return max(float(np.cbrt(volume * points_per_cell / len(points))), 1e-9)
+
+    def _cell_keys(self, points):
+        return np.floor(np.asarray(points, dtype=float).reshape(-1, 3) / self.cell_size).astype(np.int64)
+
+    def _gather(self, key, ring):
+        """
+        Collect the point indices of all cells within a Chebyshev ring distance of a cell.
+
+        :param key: Integer cell coordinates.
+        :param ring: Number of cells to extend in every direction.
+        :return: Array of point indices.
+        """
+        found = []
+        x, y, z = key
+        for dx in range(-ring, ring + 1):
+            for dy in range(-ring, ring + 1):
+                for dz in range(-ring, ring + 1):
+                    bucket = self.cells.get((x + dx, y + dy, z + dz))
+                    if bucket:
+                        found.extend(bucket)
+        return np.array(found, dtype=np.int64)
+
+    def _group_by_cell(self, queries):
+        keys = self._cell_keys(queries)
+        if len(keys) == 1:
+            yield tuple(keys[0].tolist()), np.zeros(1, dtype=np.int64)
+            return
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        order = np.argsort(inverse.ravel(), kind='stable')
+        bounds = np.searchsorted(inverse.ravel()[order], np.arange(len(unique_keys) + 1))
+        for cell, key in enumerate(map(tuple, unique_keys.tolist())):
+            yield key, order[bounds[cell]:bounds[cell + 1]]
+
+    def query(self, queries, k):
+        queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+        k = min(k, len(self.points))
+        distances = np.full((len(queries), k), np.inf)
+        indices = np.zeros((len(queries), k), dtype=np.int64)
+        if k == 0:
+            return distances, indices
+
+        lowest, highest = self._lowest, self._highest
+        for key, members in self._group_by_cell(queries):
+            # Beyond this ring every occupied cell of the grid has been visited.
+            max_ring = int(max(np.max(np.array(key) - lowest), np.max(highest - np.array(key)), 0))
+            ring = 0
+            while True:
+                # Once the rings span more cells than are occupied, or so many cells that looking
+                # them up costs more than a vectorized pass over all points, scan all points.
+                scan_all = (2 * ring + 1) ** 3 >= min(len(self.cells), len(self.points) // 8)
+                candidates = np.arange(len(self.points)) if scan_all else self._gather(key, ring)
+                if len(candidates) >= k or ring >= max_ring:
+                    block = queries[members]
+                    candidate_distances = np.linalg.norm(self.points[candidates][None, :, :] - block[:, None, :],
+                                                         axis=2)
+                    kth = np.partition(candidate_distances, k - 1, axis=1)[:, k - 1]
+                    # Every point outside the visited rings is at least ring * cell_size away.
+                    if scan_all or ring >= max_ring or np.all(kth <= ring * self.cell_size):
+                        nearest = np.argsort(candidate_distances, axis=1, kind='stable')[:, :k]
+                        indices[members] = candidates[nearest]
+                        distances[members] = np.take_along_axis(candidate_distances, nearest, axis=1)
+                        break
+                ring += 1
+        return distances, indices
+
+    def query_radius(self, queries, radius):
+        queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+        results = [None] * len(queries)
+        ring = int(np.ceil(radius / self.cell_size))
+        for key, members in self._group_by_cell(queries):
+            candidates = self._gather(key, ring)
+            block = queries[members]
+            candidate_distances = np.linalg.norm(self.points[candidates][None, :, :] - block[:, None, :], axis=2)
+            for row, member in enumerate(members):
+                results[member] = candidates[candidate_distances[row] <= radius]
+        return results
+
+
+NEIGHBOUR_INDEX_BACKENDS = {
+    'brute': BruteForceIndex,
+    'kdtree': KDTreeIndex,
+    'grid': GridIndex,
+}
+
+
+def create_neighbour_index(points, backend='kdtree'):
+    """
+    Build a nearest-neighbour index over a set of points.
+
+    :param points: Points to index (anything convertible to an (N, 3) array).
+    :param backend: 'kdtree', 'grid' or 'brute'.
+    :return: NeighbourIndex instance.
+    """
+    if backend not in NEIGHBOUR_INDEX_BACKENDS:
+        raise ValueError(f"Unknown neighbour index '{backend}', expected one of {tuple(NEIGHBOUR_INDEX_BACKENDS)}.")
+    return NEIGHBOUR_INDEX_BACKENDS[backend](points)
@@ -1,11 +1,17 @@
 import numpy as np
 import logging
-from .collision_detection import add_transform, check_collision, visualise_box, create_sphere, visualise, visualise_sphere, create_box
+from .collision_detection import visualise_box, create_sphere, visualise, visualise_sphere, create_box
+from .collision_checker import as_collision_checker
+from .neighbour_index import GridIndex, KDTreeIndex
 from utils import load_config, setup_logging
 
+# Limits of the candidate block size used by the batched sampler.
+MIN_SAMPLE_BLOCK = 64
+MAX_SAMPLE_BLOCK = 200_000
+
 class NodeGenerator:
-    def __init__(self, config_file="config.yaml"):
-        self.config = load_config(config_file)
+    def __init__(self, config_file="config.yaml", config=None):
+        self.config = config if config is not None else load_config(config_file)
         self.WORKSPACE_MIN = np.array(self.config['WORKSPACE_MIN'])
         self.WORKSPACE_MAX = np.array(self.config['WORKSPACE_MAX'])
         setup_logging()
@@ -24,6 +30,84 @@ class NodeGenerator:
                 return_data.append(extended_max_bound[i] + np.random.uniform(0, 1))
         return np.array(return_data)
 
+    def sample_outside_cubes(self, obstacle_data, theta, count):
+        # Vectorized sample_outside_cube for count randomly chosen obstacles.
+        cubes = np.asarray(obstacle_data, dtype=float).reshape(-1, 4)[np.random.choice(len(obstacle_data), count)]
+        half_sides = 0.5 * cubes[:, 3:4]
+        extended_min_bound = cubes[:, :3] - half_sides - theta
+        extended_max_bound = cubes[:, :3] + half_sides + theta
+
+        below = np.random.choice(2, size=(count, 3)).astype(bool)
+        offsets = np.random.uniform(0, 1, size=(count, 3))
+        return np.where(below, extended_min_bound - offsets, extended_max_bound + offsets)
+
+    def generate_random_nodes(self, count):
+        return np.random.uniform(self.WORKSPACE_MIN, self.WORKSPACE_MAX, size=(count, 3))
+
+    def filter_candidates(self, candidates, obstacles, robot_radius, accepted, minimum_distance):
+        # Keep the collision-free candidates that are at least minimum_distance away from the
+        # accepted nodes and from every earlier kept candidate of the same block.
+        candidates = candidates[~as_collision_checker(obstacles).collision_mask(candidates, robot_radius)]
+        if len(candidates) == 0 or minimum_distance <= 0:
+            return candidates
+
+        if len(accepted):
+            distances, _ = KDTreeIndex(accepted).query(candidates, 1)
+            candidates = candidates[distances[:, 0] >= minimum_distance]
+
+        keep = np.ones(len(candidates), dtype=bool)
+        pairs = KDTreeIndex(candidates).tree.query_pairs(minimum_distance, output_type='ndarray')
+        if len(pairs):
+            pairs = pairs[np.linalg.norm(candidates[pairs[:, 0]] - candidates[pairs[:, 1]], axis=1) < minimum_distance]
+            # Pairs are (earlier, later); resolving them by the later index makes the earlier verdict final.
+            for earlier, later in pairs[np.argsort(pairs[:, 1], kind='stable')].tolist():
+                if keep[earlier]:
+                    keep[later] = False
+        return candidates[keep]
+
+    def sample_nodes_batched(self, count, sampler, obstacles, robot_radius, accepted):
+        minimum_distance = self.config['minimum_distance_between_nodes']
+        new_nodes = []
+        found = 0
+        acceptance_rate = 0.5
+
+        while found < count:
+            remaining = count - found
+            block_size = int(np.clip(1.2 * remaining / max(acceptance_rate, 0.01), MIN_SAMPLE_BLOCK, MAX_SAMPLE_BLOCK))
+            existing = np.concatenate([accepted] + new_nodes) if new_nodes else accepted
+
+            kept = self.filter_candidates(sampler(block_size), obstacles, robot_radius, existing, minimum_distance)
+            kept = kept[:remaining]
+            new_nodes.append(kept)
+            found += len(kept)
+            acceptance_rate = len(kept) / block_size
+            logging.debug(f"Sampled block of {block_size} candidates, accepted {len(kept)}.")
+
+        return np.concatenate(new_nodes) if new_nodes else np.empty((0, 3))
+
+    def generate_nodes_batched(self, num_nodes, obstacles, max_robot_radius, obstacle_data, near_obstacles=False, visualization=False):
+        nodes = np.empty((0, 3))
+
+        if near_obstacles and len(obstacle_data):
+            nodes_near_obstacles = int(num_nodes * self.config['ratio_of_samples_near_obstacles'])
+            near_sampler = lambda count: self.sample_outside_cubes(obstacle_data, max_robot_radius, count)
+            nodes = self.sample_nodes_batched(nodes_near_obstacles, near_sampler, obstacles, max_robot_radius, nodes)
+
+        uniform_nodes = self.sample_nodes_batched(num_nodes - len(nodes), self.generate_random_nodes,
+                                                  obstacles, max_robot_radius, nodes)
+        nodes = np.ascontiguousarray(np.concatenate((nodes, uniform_nodes)))
+
+        logging.info(f"Generated {len(nodes)} collision-free nodes.")
+
+        if visualization:
+            visual_objects = [visualise_sphere(create_sphere(0.4), translation=node) for node in nodes]
+            for obstacle in obstacle_data:
+                box = create_box(obstacle[3], obstacle[3], obstacle[3])
+                visual_objects.append(visualise_box(box, translation=obstacle[:3]))
+            visualise(*visual_objects)
+
+        return nodes
+
     def node_exists_near(self, node, nodes, radius):
         for existing_node in nodes:
             distance = np.linalg.norm(node - existing_node)
@@ -35,19 +119,21 @@ class NodeGenerator:
         return np.random.uniform(self.WORKSPACE_MIN, self.WORKSPACE_MAX)
 
     def check_node_collision(self, node, obstacles, robot_radius):
-        sphere = create_sphere(robot_radius)
-        sphere_w_tf = add_transform(sphere, translation=node)
-
-        for obstacle in obstacles:
-            collision_result = check_collision(obstacle, sphere_w_tf)
-            if collision_result.is_collision:
-                logging.debug(f"Node {node} collides with an obstacle.")
-                return False
+        if not as_collision_checker(obstacles).is_collision_free(node, robot_radius):
+            logging.debug(f"Node {node} collides with an obstacle.")
+            return False
         return True
 
     def generate_nodes(self, num_nodes, obstacles, max_robot_radius, obstacle_data, near_obstacles=False, visualization=False):
+        if self.config['node_sampling'] == 'batched':
+            return self.generate_nodes_batched(num_nodes, obstacles, max_robot_radius, obstacle_data,
+                                               near_obstacles, visualization)
+
         nodes = []
         visual_objects = []
+        minimum_distance = self.config['minimum_distance_between_nodes']
+        # Spatial hash of the accepted nodes for constant-time minimum-distance rejection.
+        accepted_index = GridIndex(np.empty((0, 3)), cell_size=minimum_distance or 1.0)
 
         nodes_near_obstacles = int(num_nodes * self.config['ratio_of_samples_near_obstacles'])
        
@@ -64,19 +150,23 @@ class NodeGenerator:
 
                 if self.check_node_collision(sample_near_obstacle, obstacles, max_robot_radius):
                     
-                    if not self.node_exists_near(sample_near_obstacle, nodes, self.config['minimum_distance_between_nodes']):
+                    if not accepted_index.has_point_within(sample_near_obstacle, minimum_distance):
                         nodes.append(sample_near_obstacle)
-                        sphere = create_sphere(0.4)
-                        visual_objects.append(visualise_sphere(sphere, translation=sample_near_obstacle))
+                        accepted_index.insert(sample_near_obstacle)
+                        if visualization:
+                            sphere = create_sphere(0.4)
+                            visual_objects.append(visualise_sphere(sphere, translation=sample_near_obstacle))
         
         while len(nodes) < num_nodes + nodes_near_obstacles:
             node = self.generate_random_node()
 
             if self.check_node_collision(node, obstacles, max_robot_radius):
-                if not self.node_exists_near(node, nodes, self.config['minimum_distance_between_nodes']):
+                if not accepted_index.has_point_within(node, minimum_distance):
                     nodes.append(node)
-                    sphere = create_sphere(0.4)
-                    visual_objects.append(visualise_sphere(sphere, translation=node))
+                    accepted_index.insert(node)
+                    if visualization:
+                        sphere = create_sphere(0.4)
+                        visual_objects.append(visualise_sphere(sphere, translation=node))
 
         logging.info(f"Generated {len(nodes)} collision-free nodes.")
         
@@ -0,0 +1,145 @@
+import struct
+import numpy as np
+
+# File layout: a fixed-size header (magic, nodes, entries, flags) followed by the arrays in
+# ROADMAP_ARRAYS order, each starting on a ROADMAP_ALIGNMENT byte boundary so it can be
+# memory-mapped in place.
+ROADMAP_MAGIC = b'PRMCSR02'
+ROADMAP_HEADER = struct.Struct('<8sQQQ')
+# Header flag set when the edges are unchecked Lazy PRM candidates.
+ROADMAP_UNCHECKED = 1
+ROADMAP_ALIGNMENT = 64
+ROADMAP_ARRAYS = (
+    ('nodes', np.float64, 'nodes'),
+    ('indptr', np.int64, 'indptr'),
+    ('indices', np.int32, 'entries'),
+    ('lengths', np.float64, 'entries'),
+    ('edge_ids', np.int32, 'entries'),
+)
+
+ROADMAP_ARRAY_NAMES = tuple(name for name, _, _ in ROADMAP_ARRAYS)
+
+
+def _aligned(offset):
+    return -(-offset // ROADMAP_ALIGNMENT) * ROADMAP_ALIGNMENT
+
+
+class Roadmap:
+    """
+    Roadmap stored as a node array plus a CSR adjacency.
+
+    The neighbours of node i are indices[indptr[i]:indptr[i + 1]]. Every undirected edge
+    appears once in each direction; lengths holds the Euclidean length of each entry and
+    edge_ids the position of the edge in the edges_pair list it was built from. Neighbours
+    are listed in the order the edges appear in edges_pair.
+
+    Attributes:
+        unchecked (bool): True when the edges are Lazy PRM candidates that were never
+                          collision-checked.
+        nodes (np.ndarray): (N, 3) float64 node coordinates.
+        indptr (np.ndarray): (N + 1,) int64 row pointer.
+        indices (np.ndarray): (2E,) int32 neighbour node ids.
+        lengths (np.ndarray): (2E,) float64 edge lengths.
+        edge_ids (np.ndarray): (2E,) int32 undirected edge ids.
+    """
+
+    def __init__(self, nodes, indptr, indices, lengths, edge_ids, unchecked=False):
+        self.nodes = nodes
+        self.indptr = indptr
+        self.indices = indices
+        self.lengths = lengths
+        self.edge_ids = edge_ids
+        self.unchecked = unchecked
+
+    @property
+    def num_nodes(self):
+        return len(self.nodes)
+
+    @property
+    def num_edges(self):
+        return len(self.indices) // 2
+
+    @classmethod
+    def from_edge_pairs(cls, nodes, edges_pair, unchecked=False):
+        """
+        Build the CSR roadmap from a node list and edge pairs.
+
+        :param nodes: List or (N, 3) array of nodes.
+        :param edges_pair: List of edge pairs (i, j).
+        :param unchecked: True when the edges are Lazy PRM candidates that were never collision-checked.
+        :return: Roadmap instance.
+        """
+        nodes = np.asarray(nodes, dtype=np.float64).reshape(-1, 3)
+        pairs = np.asarray(edges_pair, dtype=np.int64).reshape(-1, 2)
+
+        # Interleave both directions so a stable sort keeps the edges_pair order per node.
+        sources = pairs.ravel()
+        targets = pairs[:, ::-1].ravel()
+        edge_ids = np.repeat(np.arange(len(pairs)), 2)
+        order = np.argsort(sources, kind='stable')
+
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=len(nodes))))).astype(np.int64)
+        lengths = np.linalg.norm(nodes[sources[order]] - nodes[targets[order]], axis=1)
+        return cls(nodes, indptr, targets[order].astype(np.int32),
+                   lengths, edge_ids[order].astype(np.int32), unchecked=unchecked)
+
+    def edge_pairs(self):
+        """
+        Recover the edge pairs in their original order, each as (smaller id, larger id).
+
+        :return: (E, 2) array of edge pairs (i, j).
+        """
+        sources = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+        forward = sources <= self.indices
+        pairs = np.zeros((self.num_edges, 2), dtype=np.int64)
+        pairs[self.edge_ids[forward], 0] = sources[forward]
+        pairs[self.edge_ids[forward], 1] = self.indices[forward]
+        return pairs
+
+    def save(self, path):
+        """
+        Write the roadmap to a binary file that load can memory-map.
+
+        :param path: Output file path.
+        """
+        with open(path, 'wb') as file:
+            flags = ROADMAP_UNCHECKED if self.unchecked else 0
+            file.write(ROADMAP_HEADER.pack(ROADMAP_MAGIC, self.num_nodes, len(self.indices), flags))
+            for name, dtype, _ in ROADMAP_ARRAYS:
+                file.write(b'\0' * (_aligned(file.tell()) - file.tell()))
+                file.write(np.ascontiguousarray(getattr(self, name), dtype=dtype).tobytes())
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Read a roadmap written by save.
+
+        :param path: Roadmap file path.
+        :param mmap: Memory-map the arrays read-only instead of reading them into memory,
+                     so processes opening the same file share its pages.
+        :return: Roadmap instance.
+        """
+        with open(path, 'rb') as file:
+            magic, num_nodes, num_entries, flags = ROADMAP_HEADER.unpack(file.read(ROADMAP_HEADER.size))
+        if magic != ROADMAP_MAGIC:
+            raise ValueError(f"'{path}' is not a roadmap file.")
+
+        shapes = {
+            'nodes': (num_nodes, 3),
+            'indptr': (num_nodes + 1,),
+            'entries': (num_entries,),
+        }
+        arrays = {}
+        offset = ROADMAP_HEADER.size
+        for name, dtype, kind in ROADMAP_ARRAYS:
+            shape = shapes[kind]
+            size = int(np.prod(shape))
+            offset = _aligned(offset)
+            if size == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+            elif mmap:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+            else:
+                arrays[name] = np.fromfile(path, dtype=dtype, count=size, offset=offset).reshape(shape)
+            offset += size * np.dtype(dtype).itemsize
+        return cls(**arrays, unchecked=bool(flags & ROADMAP_UNCHECKED))
@@ -0,0 +1,140 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+# Configuration keys that change the generated roadmap.
+ROADMAP_CONFIG_KEYS = (
+    'num_nodes',
+    'nearest_nodes',
+    'point_check_distance',
+    'minimum_distance_between_nodes',
+    'sampling_near_obstacles',
+    'ratio_of_samples_near_obstacles',
+    'node_sampling',
+    'edge_validation',
+    'lazy_prm',
+    'collision_backend',
+    'seed',
+)
+
+CACHE_SUFFIX = '.roadmap.npz'
+
+
+class RoadmapCache:
+    """
+    On-disk cache of generated roadmaps keyed by scene and configuration.
+
+    Each entry is one uncompressed .npz file holding the nodes, the edge pairs and the
+    per-node edge lists in CSR form. File modification times track the last use, and
+    the least recently used entries are evicted once the cache exceeds its size limit.
+
+    Attributes:
+        cache_dir (str): Directory holding the cache entries.
+        max_bytes (int): Size limit of the cache directory in bytes.
+    """
+
+    def __init__(self, cache_dir, max_size_mb=512):
+        """
+        Initialize the cache.
+
+        :param cache_dir: Directory holding the cache entries; created if missing.
+        :param max_size_mb: Size limit of the cache in megabytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(obstacle_data, max_radius, workspace_min, workspace_max, config):
+        """
+        Hash everything that determines a roadmap.
+
+        :param obstacle_data: List of (center_x, center_y, center_z, side_length) obstacles.
+        :param max_radius: Effective robot radius used for collision checking.
+        :param workspace_min: Minimum workspace coordinates.
+        :param workspace_max: Maximum workspace coordinates.
+        :param config: Configuration dictionary.
+        :return: Hex digest identifying the roadmap.
+        """
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(obstacle_data, dtype=np.float64).reshape(-1, 4).tobytes())
+        digest.update(np.array([max_radius], dtype=np.float64).tobytes())
+        digest.update(np.asarray(workspace_min, dtype=np.float64).tobytes())
+        digest.update(np.asarray(workspace_max, dtype=np.float64).tobytes())
+        settings = {key: config.get(key) for key in ROADMAP_CONFIG_KEYS}
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def load(self, key):
+        """
+        Load a cached roadmap.
+
+        :param key: Key returned by make_key.
+        :return: Tuple (nodes, edges, edges_pair) or None on a cache miss.
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as data:
+                nodes = data['nodes']
+                edges_pair = [tuple(pair) for pair in data['edges_pair'].tolist()]
+                indptr, indices = data['edges_indptr'], data['edges_indices'].tolist()
+        except Exception as e:
+            logging.warning(f"Discarding unreadable roadmap cache entry {path}: {e}")
+            os.remove(path)
+            return None
+
+        edges = [indices[indptr[i]:indptr[i + 1]] for i in range(len(nodes))]
+        os.utime(path)
+        logging.info(f"Loaded roadmap with {len(nodes)} nodes from cache {path}")
+        return nodes, edges, edges_pair
+
+    def store(self, key, nodes, edges, edges_pair):
+        """
+        Store a roadmap and evict the least recently used entries beyond the size limit.
+
+        :param key: Key returned by make_key.
+        :param nodes: List or (N, 3) array of nodes.
+        :param edges: Per-node lists of connected node indices.
+        :param edges_pair: List of edge pairs (i, j).
+        """
+        indptr = np.concatenate(([0], np.cumsum([len(node_edges) for node_edges in edges]))).astype(np.int64)
+        indices = np.fromiter((j for node_edges in edges for j in node_edges), dtype=np.int32, count=indptr[-1])
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            np.savez(file,
+                     nodes=np.asarray(nodes, dtype=np.float64).reshape(-1, 3),
+                     edges_pair=np.asarray(edges_pair, dtype=np.int32).reshape(-1, 2),
+                     edges_indptr=indptr,
+                     edges_indices=indices)
+        os.replace(tmp_path, path)
+        logging.info(f"Stored roadmap in cache {path}")
+
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits its size limit.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_SUFFIX):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+            logging.info(f"Evicted roadmap cache entry {name}")
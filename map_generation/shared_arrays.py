@@ -0,0 +1,40 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def share_array(array):
+    """
+    Copy a NumPy array into a new shared memory block.
+
+    The caller owns the block and must close() and unlink() it when the workers are done.
+
+    :param array: Array to share.
+    :return: The SharedMemory block and a picklable spec (name, shape, dtype) to attach to it.
+    """
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def attach_array(spec):
+    """
+    Attach to an array shared with share_array, without copying it.
+
+    :param spec: Spec returned by share_array.
+    :return: The SharedMemory block (keep a reference while the array is used) and the array view.
+    """
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def release_arrays(blocks):
+    """
+    Close and unlink shared memory blocks created by share_array.
+
+    :param blocks: Iterable of SharedMemory blocks.
+    """
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
@@ -1,7 +1,12 @@
 import os
 import logging
+import warnings
+import numpy as np
 from typing import List, Tuple
 
+# Extension of scene files stored as NumPy arrays instead of text.
+SCENE_NPZ_EXTENSION = '.npz'
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -12,13 +17,17 @@ class MotionPlanningInput:
         self.num_obstacles = 0
         self.robot_radii = []
         self.initial_goal_configs = []
-        self.obstacles = []
+        self.obstacles = np.zeros((0, 4))
 
     def read_input_file(self):
         if not os.path.exists(self.filepath):
             logging.error(f"Input file '{self.filepath}' does not exist.")
             raise FileNotFoundError(f"File '{self.filepath}' not found.")
 
+        if self.filepath.lower().endswith(SCENE_NPZ_EXTENSION):
+            self.read_npz_file()
+            return
+
         try:
             with open(self.filepath, 'r') as file:
                 lines = file.readlines()
@@ -30,7 +39,7 @@ class MotionPlanningInput:
             self.num_robots, self.num_obstacles = self._parse_first_line(lines[0])
             self.robot_radii = self._parse_robot_radii(lines[1])
             self.initial_goal_configs = self._parse_robot_configs(lines[2:2+self.num_robots])
-            self.obstacles = self._parse_obstacles(lines[2+self.num_robots:])
+            self.obstacles = self._parse_obstacles_bulk(lines[2+self.num_robots:])
 
             logging.info("Successfully read and parsed the input file.")
 
@@ -89,6 +98,77 @@ class MotionPlanningInput:
                 raise
         return obstacles
 
+    def _parse_obstacles_bulk(self, lines: List[str]) -> np.ndarray:
+        """
+        Parse all obstacle lines with NumPy's C text reader.
+
+        Anything the reader rejects or reads into the wrong shape (blank lines, missing or extra
+        values, numbers only Python's float() accepts) is handed to _parse_obstacles, which
+        parses or reports the offending line exactly as before.
+
+        :param lines: Obstacle lines of the input file.
+        :return: (M, 4) array of (center_x, center_y, center_z, side_length) obstacles.
+        """
+        if not lines:
+            return np.zeros((0, 4))
+        try:
+            with warnings.catch_warnings():
+                # Whitespace-only input only warns; the shape check below rejects it.
+                warnings.simplefilter('ignore', UserWarning)
+                obstacles = np.loadtxt(lines, dtype=float, comments=None, ndmin=2)
+        except ValueError:
+            obstacles = None
+        if obstacles is None or obstacles.shape != (len(lines), 4):
+            obstacles = np.asarray(self._parse_obstacles(lines), dtype=float).reshape(-1, 4)
+        return obstacles
+
+    def read_npz_file(self):
+        """
+        Read a scene stored by save_npz_file: robot_radii (R,), starts (R, 3), goals (R, 3)
+        and obstacles (M, 4) arrays.
+        """
+        try:
+            with np.load(self.filepath) as data:
+                radii = np.asarray(data['robot_radii'], dtype=float).reshape(-1)
+                starts = np.asarray(data['starts'], dtype=float)
+                goals = np.asarray(data['goals'], dtype=float)
+                obstacles = np.asarray(data['obstacles'], dtype=float)
+
+            if len(radii) == 0:
+                logging.error("Scene file must contain at least one robot.")
+                raise ValueError("Scene file has no robots.")
+            if starts.shape != (len(radii), 3) or goals.shape != (len(radii), 3):
+                logging.error("Robot starts and goals must be (number of robots, 3) arrays.")
+                raise ValueError("Mismatch in the number of robot configurations.")
+            if obstacles.ndim != 2 or obstacles.shape[1] != 4:
+                logging.error("Obstacles must be a (number of obstacles, 4) array.")
+                raise ValueError("Invalid obstacle array.")
+
+            self.num_robots = len(radii)
+            self.num_obstacles = len(obstacles)
+            self.robot_radii = radii.tolist()
+            self.initial_goal_configs = [(tuple(start), tuple(goal)) for start, goal in zip(starts.tolist(), goals.tolist())]
+            self.obstacles = obstacles
+
+            logging.info("Successfully read and parsed the scene file.")
+
+        except Exception as e:
+            logging.error(f"An error occurred while reading the scene file: {e}")
+            raise
+
+    def save_npz_file(self, filepath: str):
+        """
+        Store the parsed scene as arrays, to be read back by read_npz_file.
+
+        :param filepath: Path of the .npz file.
+        """
+        configs = np.asarray(self.initial_goal_configs, dtype=float).reshape(-1, 2, 3)
+        np.savez(filepath,
+                 robot_radii=np.asarray(self.robot_radii, dtype=float),
+                 starts=configs[:, 0],
+                 goals=configs[:, 1],
+                 obstacles=np.asarray(self.obstacles, dtype=float).reshape(-1, 4))
+
     def get_data(self):
         return {
             "num_robots": self.num_robots,
@@ -1,3 +1,19 @@
+import os
+import struct
+import numpy as np
+
+# Binary trajectory file: a header (magic, number of robots, number of steps) followed by the
+# float32 points in time-major order, so steps can be appended as they are produced.
+TRAJECTORY_MAGIC = b'TRAJF32\x01'
+TRAJECTORY_HEADER = struct.Struct('<8sQQ')
+
+# Output file extensions that select the binary format when output_format is 'auto'.
+BINARY_EXTENSIONS = ('.bin', '.traj')
+
+# Number of timesteps formatted together by the text writer.
+TEXT_CHUNK_STEPS = 4096
+
+
 def format_path(points):
     """
     Format a list of tuples into a string where each tuple is a set of coordinates,
@@ -10,23 +26,165 @@ def format_path(points):
     formatted_points = " ; ".join(" ".join(f"{coord:.1f}" for coord in point) for point in points)
     return formatted_points
 
-def save_paths_to_file(final_paths, file_path):
+
+class TrajectoryWriter:
     """
-    Save the paths and initial configurations to a text file in the specified format.
+    Writes the configurations of all robots one timestep after the other.
 
-    :param final_paths: List of lists containing the path steps for each robot.
-    :param file_path: Path to the output text file.
+    Steps can be written one at a time as they are produced or many at once; either way
+    nothing but the current block of steps has to be held in memory. Use as a context manager
+    or call close() to finish the file.
+
+    Attributes:
+        file_path (str): Path to the output file.
+        num_robots (int): Number of robots in every step.
+        num_steps (int): Number of steps written so far.
+    """
+
+    mode = 'w'
+
+    def __init__(self, file_path, num_robots):
+        """
+        Open the output file and write its header.
+
+        :param file_path: Path to the output file.
+        :param num_robots: Number of robots in every step.
+        """
+        self.file_path = file_path
+        self.num_robots = num_robots
+        self.num_steps = 0
+        self.file = open(file_path, self.mode)
+        self.write_header()
+
+    def write_header(self):
+        raise NotImplementedError
+
+    def write_steps(self, steps):
+        """
+        Write a block of timesteps.
+
+        :param steps: (T, R, 3) array with the position of every robot at every step.
+        """
+        raise NotImplementedError
+
+    def write_step(self, configuration):
+        """
+        Write one timestep.
+
+        :param configuration: (R, 3) array or list with the position of every robot.
+        """
+        self.write_steps(np.asarray(configuration, dtype=np.float64).reshape(1, self.num_robots, 3))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TextTrajectoryWriter(TrajectoryWriter):
     """
-   
-    with open(file_path, 'w') as file:
-        
-        num_robots = len(final_paths)
-        file.write(f"{num_robots}\n")
+    Writes the text format: the number of robots on the first line, then one line per step
+    holding every robot's position with one decimal, robots separated by ' ; '.
+    """
+
+    def write_header(self):
+        self.file.write(f"{self.num_robots}\n")
 
-        for i in range(len(final_paths[0])):
+    def write_steps(self, steps):
+        steps = np.asarray(steps, dtype=np.float64).reshape(-1, self.num_robots, 3)
+        # '%.1f' formats exactly like the f"{coord:.1f}" of format_path.
+        line = " ; ".join(["%.1f %.1f %.1f"] * self.num_robots) + "\n"
+        for first in range(0, len(steps), TEXT_CHUNK_STEPS):
+            block = steps[first:first + TEXT_CHUNK_STEPS]
+            self.file.write((line * len(block)) % tuple(block.ravel().tolist()))
+        self.num_steps += len(steps)
 
-            configuration = [path[i] for path in final_paths] 
-            add_line = format_path(configuration)
-            file.write(f"{add_line}\n")
-   
 
+class BinaryTrajectoryWriter(TrajectoryWriter):
+    """
+    Writes the binary format: TRAJECTORY_HEADER followed by (T, R, 3) float32 points.
+    The step count in the header is filled in when the writer is closed.
+    """
+
+    mode = 'wb'
+
+    def write_header(self):
+        self.file.write(TRAJECTORY_HEADER.pack(TRAJECTORY_MAGIC, self.num_robots, 0))
+
+    def write_steps(self, steps):
+        steps = np.asarray(steps, dtype=np.float32).reshape(-1, self.num_robots, 3)
+        self.file.write(np.ascontiguousarray(steps).tobytes())
+        self.num_steps += len(steps)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.seek(0)
+            self.file.write(TRAJECTORY_HEADER.pack(TRAJECTORY_MAGIC, self.num_robots, self.num_steps))
+        super().close()
+
+
+TRAJECTORY_WRITERS = {
+    'text': TextTrajectoryWriter,
+    'binary': BinaryTrajectoryWriter,
+}
+
+
+def trajectory_format(file_path, output_format='auto'):
+    """
+    Resolve the format an output file is written in.
+
+    :param file_path: Path to the output file.
+    :param output_format: 'text', 'binary', or 'auto' to choose by the file extension.
+    :return: 'text' or 'binary'.
+    """
+    if output_format == 'auto':
+        return 'binary' if os.path.splitext(file_path)[1].lower() in BINARY_EXTENSIONS else 'text'
+    if output_format not in TRAJECTORY_WRITERS:
+        raise ValueError(f"Unknown output format '{output_format}', expected 'auto' or one of {tuple(TRAJECTORY_WRITERS)}.")
+    return output_format
+
+
+def open_trajectory_writer(file_path, num_robots, output_format='auto'):
+    """
+    Open a streaming writer for an output file.
+
+    :param file_path: Path to the output file.
+    :param num_robots: Number of robots in every step.
+    :param output_format: 'text', 'binary', or 'auto' to choose by the file extension.
+    :return: TrajectoryWriter instance.
+    """
+    return TRAJECTORY_WRITERS[trajectory_format(file_path, output_format)](file_path, num_robots)
+
+
+def load_trajectories(file_path):
+    """
+    Read a binary trajectory file written by BinaryTrajectoryWriter.
+
+    :param file_path: Path to the trajectory file.
+    :return: (R, T, 3) float32 array with the path of every robot.
+    """
+    with open(file_path, 'rb') as file:
+        magic, num_robots, num_steps = TRAJECTORY_HEADER.unpack(file.read(TRAJECTORY_HEADER.size))
+        if magic != TRAJECTORY_MAGIC:
+            raise ValueError(f"'{file_path}' is not a trajectory file.")
+        steps = np.fromfile(file, dtype=np.float32, count=num_steps * num_robots * 3)
+    if len(steps) != num_steps * num_robots * 3:
+        raise ValueError(f"Trajectory file '{file_path}' is truncated.")
+    return steps.reshape(num_steps, num_robots, 3).transpose(1, 0, 2)
+
+
+def save_paths_to_file(final_paths, file_path, output_format='auto'):
+    """
+    Save the paths and initial configurations to a text file in the specified format.
+
+    :param final_paths: List of lists containing the path steps for each robot, or an (R, T, 3) array.
+    :param file_path: Path to the output text file.
+    :param output_format: 'text', 'binary', or 'auto' to choose by the file extension.
+    """
+    paths = np.asarray(final_paths, dtype=np.float64)
+    with open_trajectory_writer(file_path, len(final_paths), output_format) as writer:
+        writer.write_steps(paths.transpose(1, 0, 2))
@@ -1,4 +1,5 @@
-from typing import List, Tuple
+import heapq
+from typing import Tuple
 import numpy as np
 
 def euclidean_distance(point1: Tuple[float, float, float], point2: Tuple[float, float, float]) -> float:
@@ -11,56 +12,49 @@ def euclidean_distance(point1: Tuple[float, float, float], point2: Tuple[float,
     """
     return np.linalg.norm(np.array(point1) - np.array(point2))
 
-def find_largest_distance_segment(path: List[Tuple[float, float, float]]) -> int:
+def subdivide_path(path: np.ndarray, num_points: int) -> np.ndarray:
     """
-    Find the index of the consecutive line segment with the largest distance in a list of points.
-    
-    :param path: List of continuous points.
-    :return: Index of the segment with the largest distance.
+    Insert midpoints into a path until it has num_points points.
+
+    The longest segment is split in half each time, the first one along the path when several
+    are equally long. Segments wait in a heap keyed by (negative length, position along the
+    path), so each split costs O(log n) instead of a rescan of the whole path. The position of
+    a segment is its original segment index followed by the left (0) / right (1) halves taken
+    to reach it, which compares in path order because no segment's key is a prefix of another's.
+
+    :param path: (L, 3) array of points; it is not modified.
+    :param num_points: Number of points of the result, at least L.
+    :return: (num_points, 3) array of points.
     """
+    if len(path) == num_points:
+        return path.copy()
     if len(path) < 2:
         raise ValueError("Path must have at least two points to calculate distances.")
-    
-    max_distance = 0
-    idx = 0
-
-    for i in range(len(path) - 1):
-        distance = euclidean_distance(path[i], path[i + 1])
-        if distance > max_distance:
-            max_distance = distance
-            idx = i
-    
-    return idx
 
+    heap = [(-euclidean_distance(path[i], path[i + 1]), i, (), path[i], path[i + 1])
+            for i in range(len(path) - 1)]
+    heapq.heapify(heap)
 
-def make_equal_steps(paths):
-    
-    max_length = 0
-    for path in paths:
-        if max_length < len(path):
-            max_length = len(path)
+    for _ in range(num_points - len(path)):
+        _, index, halves, start, end = heapq.heappop(heap)
+        middle = (start + end) / 2
+        heapq.heappush(heap, (-euclidean_distance(start, middle), index, halves + (0,), start, middle))
+        heapq.heappush(heap, (-euclidean_distance(middle, end), index, halves + (1,), middle, end))
 
-    return_path = []
-    for path in paths:
-        
-
-        while len(path) != max_length:
-
-            idx = find_largest_distance_segment(path)
-            
-            
-            middle_point = [0, 0, 0]
-            for i in range(3):
-                middle_point[i] = (path[idx][i] + path[idx + 1][i])/2
-            middle_point = tuple(middle_point)
-            
-            path.insert(idx + 1, middle_point)
-
-        return_path.append(path)
-    return return_path
-
-            
+    segments = sorted(heap, key=lambda segment: (segment[1], segment[2]))
+    return np.array([segment[3] for segment in segments] + [path[-1]])
 
 
+def make_equal_steps(paths):
+    """
+    Pad all paths to the number of points of the longest one by splitting their longest segments.
 
+    :param paths: List of paths, each a list of 3D points or an (L, 3) array; they are not modified.
+    :return: (R, L, 3) array holding the padded path of every robot.
+    """
+    arrays = [np.asarray(path, dtype=np.float64).reshape(-1, 3) for path in paths]
+    if not arrays:
+        return np.empty((0, 0, 3))
 
+    max_length = max(len(path) for path in arrays)
+    return np.stack([subdivide_path(path, max_length) for path in arrays])
@@ -0,0 +1,216 @@
+import time
+import logging
+import numpy as np
+from utils import load_config
+from map_generation.collision_checker import as_collision_checker
+
+# Shortcutting passes selectable through the 'shortcut_mode' config key.
+SHORTCUT_MODES = ('none', 'greedy', 'random', 'both')
+
+# Upper bound on the number of segment-to-point distances evaluated in one NumPy pass.
+MAX_DISTANCES_PER_CHUNK = 4_000_000
+
+
+def segment_point_distances(starts, ends, points):
+    """
+    Distance from every segment to the nearest of a set of points.
+
+    :param starts: (M, 3) array of segment start points.
+    :param ends: (M, 3) array of segment end points.
+    :param points: (P, 3) array of points.
+    :return: Array of shape (M,) with the smallest distance of each segment to any point
+             (infinite when there are no points).
+    """
+    distances = np.full(len(starts), np.inf)
+    if len(points) == 0 or len(starts) == 0:
+        return distances
+
+    directions = ends - starts
+    lengths_sq = np.maximum(np.einsum('ij,ij->i', directions, directions), 1e-12)
+    rows = max(1, MAX_DISTANCES_PER_CHUNK // len(points))
+    for first in range(0, len(starts), rows):
+        block = slice(first, first + rows)
+        offsets = points[None, :, :] - starts[block, None, :]
+        t = np.clip(np.einsum('mpk,mk->mp', offsets, directions[block]) / lengths_sq[block, None], 0.0, 1.0)
+        closest = starts[block, None, :] + t[..., None] * directions[block, None, :]
+        distances[block] = np.linalg.norm(points[None, :, :] - closest, axis=2).min(axis=1)
+    return distances
+
+
+class PathShortcutter:
+    """
+    Removes redundant waypoints from planned paths by replacing runs of segments with
+    straight collision-free shortcuts.
+
+    Only existing waypoints are dropped, no new points are created, so the start and goal of
+    every path are kept. Shortcuts span many roadmap edges, so they are checked as continuous
+    swept spheres rather than at sampled points, whatever edge_validation is set to.
+
+    A shortcut is rejected when it passes closer than two robot radii to a waypoint of another
+    robot's path, so paths stay apart wherever get_path kept their roadmap nodes disjoint.
+
+    Attributes:
+        config (dict): Configuration parameters.
+        obstacles (CollisionChecker): Collision checker over the obstacles.
+        max_radius (float): Radius of the robot used for collision checking.
+        mode (str): Shortcutting passes to run: 'none', 'greedy', 'random' or 'both'.
+        batch_size (int): Number of candidate shortcuts per path checked in one batch.
+        rng (np.random.Generator): Random generator of the randomised pass, seeded by 'seed'.
+    """
+
+    def __init__(self, obstacles, max_radius, config_file="config.yaml", config=None):
+        """
+        Initialize the shortcutter.
+
+        :param obstacles: CollisionChecker or list of obstacles.
+        :param max_radius: Radius of the robot used for collision checking.
+        :param config_file: Path to the configuration file.
+        :param config: Already loaded configuration; config_file is not read when given.
+        """
+        self.config = config if config is not None else load_config(config_file)
+        if self.config['shortcut_mode'] not in SHORTCUT_MODES:
+            raise ValueError(f"Unknown shortcut mode '{self.config['shortcut_mode']}', "
+                             f"expected one of {SHORTCUT_MODES}.")
+        self.obstacles = as_collision_checker(obstacles)
+        self.max_radius = max_radius
+        self.mode = self.config['shortcut_mode']
+        self.batch_size = self.config['shortcut_batch_size']
+        self.rng = np.random.default_rng(self.config['seed'])
+        # Waypoints of every other robot, per robot of the paths being shortened.
+        self.foreign_points = []
+
+    def valid_shortcuts(self, starts, ends, owners):
+        """
+        Check a batch of candidate shortcuts against the obstacles and the other robots.
+
+        :param starts: (M, 3) array of shortcut start points.
+        :param ends: (M, 3) array of shortcut end points.
+        :param owners: (M,) array with the index of the robot each shortcut belongs to.
+        :return: Boolean array of shape (M,), True where the shortcut may be taken.
+        """
+        valid = np.zeros(len(starts), dtype=bool)
+        if len(starts) == 0:
+            return valid
+
+        # Cheap clearance test first, so only the survivors are collision-checked.
+        for robot in np.unique(owners):
+            rows = np.flatnonzero(owners == robot)
+            clearance = segment_point_distances(starts[rows], ends[rows], self.foreign_points[robot])
+            valid[rows] = clearance >= 2 * self.max_radius
+        if valid.any():
+            valid[valid] = ~self.obstacles.segment_collision_mask(starts[valid], ends[valid], self.max_radius)
+        return valid
+
+    def greedy_pass(self, paths, deadline):
+        """
+        Walk every path from its start and jump to the farthest waypoint within the next
+        batch_size that can be reached in a straight line. All paths advance together, so each
+        round is one batched check.
+
+        :param paths: List of (L, 3) arrays.
+        :param deadline: perf_counter time at which to stop, or None.
+        :return: List of boolean keep masks, one per path.
+        """
+        keep = [np.ones(len(path), dtype=bool) for path in paths]
+        anchors = [0] * len(paths)
+        while deadline is None or time.perf_counter() < deadline:
+            starts, ends, owners, targets = [], [], [], []
+            for robot, path in enumerate(paths):
+                anchor = anchors[robot]
+                candidates = np.arange(anchor + 2, min(anchor + 2 + self.batch_size, len(path)))
+                starts.append(np.repeat(path[anchor:anchor + 1], len(candidates), axis=0))
+                ends.append(path[candidates])
+                owners.append(np.full(len(candidates), robot))
+                targets.append(candidates)
+            owners = np.concatenate(owners)
+            if len(owners) == 0:
+                break
+
+            valid = self.valid_shortcuts(np.concatenate(starts), np.concatenate(ends), owners)
+            targets = np.concatenate(targets)
+            for robot, path in enumerate(paths):
+                anchor = anchors[robot]
+                if anchor >= len(path) - 2:
+                    continue
+                reachable = targets[(owners == robot) & valid]
+                target = reachable.max() if len(reachable) else anchor + 1
+                keep[robot][anchor + 1:target] = False
+                anchors[robot] = target
+        return keep
+
+    def random_pass(self, paths, keep, deadline):
+        """
+        Try shortcuts between random pairs of the remaining waypoints, batch_size pairs per
+        path at a time, until shortcut_iterations pairs per path were tried or time runs out.
+
+        :param paths: List of (L, 3) arrays.
+        :param keep: List of boolean keep masks, one per path; updated in place.
+        :param deadline: perf_counter time at which to stop, or None.
+        :return: The updated keep masks.
+        """
+        iterations = self.config['shortcut_iterations']
+        tried = 0
+        while tried < iterations and (deadline is None or time.perf_counter() < deadline):
+            count = min(self.batch_size, iterations - tried)
+            tried += count
+
+            starts, ends, owners, spans = [], [], [], []
+            for robot, path in enumerate(paths):
+                kept = np.flatnonzero(keep[robot])
+                if len(kept) < 3:
+                    continue
+                first = self.rng.integers(0, len(kept) - 2, size=count)
+                last = self.rng.integers(first + 2, len(kept))
+                starts.append(path[kept[first]])
+                ends.append(path[kept[last]])
+                owners.append(np.full(count, robot))
+                spans.append(np.column_stack((kept[first], kept[last])))
+            if not owners:
+                break
+
+            owners = np.concatenate(owners)
+            valid = self.valid_shortcuts(np.concatenate(starts), np.concatenate(ends), owners)
+            spans = np.concatenate(spans)
+
+            # Apply the valid shortcuts longest first, skipping those overlapping one already taken.
+            for robot in np.unique(owners[valid]):
+                taken = []
+                robot_spans = spans[(owners == robot) & valid]
+                longest_first = np.argsort(robot_spans[:, 0] - robot_spans[:, 1], kind='stable')
+                for first, last in robot_spans[longest_first]:
+                    if all(last <= other_first or other_last <= first for other_first, other_last in taken):
+                        keep[robot][first + 1:last] = False
+                        taken.append((first, last))
+        return keep
+
+    def shortcut(self, paths):
+        """
+        Shorten the paths of all robots.
+
+        :param paths: List of paths, each a list of 3D points; None entries are passed through.
+        :return: List of shortened paths as lists of the kept points, in the same order.
+        """
+        found = [index for index, path in enumerate(paths) if path is not None]
+        if self.mode == 'none' or not found:
+            return list(paths)
+
+        arrays = [np.asarray(paths[index], dtype=float).reshape(-1, 3) for index in found]
+        self.foreign_points = [np.concatenate([other for j, other in enumerate(arrays) if j != robot] or
+                                              [np.empty((0, 3))])
+                               for robot in range(len(arrays))]
+
+        budget = self.config['shortcut_time_budget']
+        deadline = None if budget is None else time.perf_counter() + budget
+
+        keep = [np.ones(len(path), dtype=bool) for path in arrays]
+        if self.mode in ('greedy', 'both'):
+            keep = self.greedy_pass(arrays, deadline)
+        if self.mode in ('random', 'both'):
+            keep = self.random_pass(arrays, keep, deadline)
+
+        shortened = list(paths)
+        for robot, index in enumerate(found):
+            shortened[index] = [point for point, kept in zip(paths[index], keep[robot]) if kept]
+        logging.info(f"Shortcutting reduced {sum(len(path) for path in arrays)} waypoints "
+                     f"to {sum(int(mask.sum()) for mask in keep)}")
+        return shortened
@@ -1,38 +1,108 @@
+import heapq
+import logging
+import math
 import numpy as np
-from collections import deque, defaultdict
+from collections import deque
 from utils import load_config
-from .rrt import add_nodes
+from map_generation.roadmap import Roadmap
+from map_generation.neighbour_index import create_neighbour_index
+from map_generation.edge_generation import EdgeGenerator
+from .rrt import add_nodes, RRT_PLANNERS
+
+# Collision state of a roadmap edge in Lazy PRM mode.
+EDGE_UNKNOWN = 0
+EDGE_VALID = 1
+EDGE_INVALID = -1
 
 class PRM:
-    def __init__(self, nodes, edge_pairs, config_file="config.yaml"):
+    # Search routines selectable through the 'search_algorithm' config key.
+    SEARCH_ALGORITHMS = ('bfs', 'dijkstra', 'astar')
+
+    def __init__(self, nodes, edge_pairs, config_file="config.yaml", roadmap=None, config=None):
         """
         Initialize the PRM with nodes, edge pairs, and configuration settings.
 
+        Nodes are referred to by their integer index and the graph is kept as a CSR
+        adjacency; coordinates are only looked up when a path is emitted.
+
         :param nodes: List of nodes (3D coordinates as NumPy arrays).
         :param edge_pairs: List of edge pairs where each edge is a tuple of indices (start_index, end_index).
         :param config_file: Path to the configuration file.
+        :param roadmap: Prebuilt Roadmap for these nodes and edges; built from them if None.
+        :param config: Already loaded configuration; config_file is not read when given.
         """
-        self.original_nodes = [tuple(node) for node in nodes]  # Keep a copy of the original nodes
-        self.original_edge_pairs = edge_pairs
-        self.config = load_config(config_file)
-        self.used_nodes = []
-        self.graph = self._create_graph(self.original_nodes, self.original_edge_pairs)
+        self.config = config if config is not None else load_config(config_file)
+        if self.config['attach_planner'] not in ('greedy',) + tuple(RRT_PLANNERS):
+            raise ValueError(f"Unknown attach planner '{self.config['attach_planner']}', "
+                             f"expected 'greedy' or one of {tuple(RRT_PLANNERS)}.")
+        if self.config['search_algorithm'] not in self.SEARCH_ALGORITHMS:
+            raise ValueError(f"Unknown search algorithm '{self.config['search_algorithm']}', "
+                             f"expected one of {self.SEARCH_ALGORITHMS}.")
+        self.roadmap = roadmap if roadmap is not None else Roadmap.from_edge_pairs(nodes, edge_pairs)
+        self.nodes = self.roadmap.nodes
+        self.node_index = create_neighbour_index(self.nodes, self.config['neighbour_index'])
 
-    def _create_graph(self, nodes, edge_pairs):
+        # In Lazy PRM mode the roadmap edges are unchecked until a search path uses them. A roadmap
+        # saved by Lazy PRM holds unchecked edges, so it is always searched lazily.
+        self.lazy = self.config['lazy_prm'] or self.roadmap.unchecked
+        if self.lazy and not self.config['lazy_prm']:
+            logging.info("Roadmap edges were never collision-checked; searching it in Lazy PRM mode.")
+        self.edge_state = np.full(self.roadmap.num_edges, EDGE_UNKNOWN if self.lazy else EDGE_VALID, dtype=np.int8)
+        self.edge_gen = EdgeGenerator(config_file=None, config=self.config)
+
+    @classmethod
+    def from_roadmap_file(cls, file_path, config_file="config.yaml", config=None):
         """
-        Create a graph from the edge pairs.
-        
-        :param nodes: List of nodes to include in the graph.
-        :param edge_pairs: List of edge pairs to include in the graph.
-        :return: A dictionary representing the graph.
-        """
-        graph = defaultdict(list)
-        for u, v in edge_pairs:
-            node_u = tuple(nodes[u])  # Convert node at index u to tuple
-            node_v = tuple(nodes[v])  # Convert node at index v to tuple
-            graph[node_u].append(node_v)
-            graph[node_v].append(node_u)
-        return graph
+        Create a PRM from a CSR roadmap file written by MapGenerator.save_roadmap.
+
+        The roadmap arrays are memory-mapped and searched in place, so planner processes
+        opening the same file share one copy of it.
+
+        :param file_path: Path to the roadmap file.
+        :param config_file: Path to the configuration file.
+        :param config: Already loaded configuration; config_file is not read when given.
+        :return: PRM instance.
+        """
+        roadmap = Roadmap.load(file_path, mmap=True)
+        return cls(None, None, config_file=config_file, roadmap=roadmap, config=config)
+
+    def neighbours(self, node):
+        """
+        Get the neighbours of a node, skipping edges known to be in collision.
+
+        :param node: Node index.
+        :return: Lists of neighbouring node indices and of the lengths of the connecting edges.
+        """
+        begin, stop = self.roadmap.indptr[node], self.roadmap.indptr[node + 1]
+        neighbours = self.roadmap.indices[begin:stop]
+        lengths = self.roadmap.lengths[begin:stop]
+        if self.lazy:
+            usable = self.edge_state[self.roadmap.edge_ids[begin:stop]] != EDGE_INVALID
+            neighbours, lengths = neighbours[usable], lengths[usable]
+        return neighbours.tolist(), lengths.tolist()
+
+    def path_edges(self, path):
+        """
+        Get the roadmap edges along a path.
+
+        :param path: List of node indices.
+        :return: Array of edge ids, one per consecutive node pair.
+        """
+        edge_ids = []
+        for u, v in zip(path[:-1], path[1:]):
+            begin, stop = self.roadmap.indptr[u], self.roadmap.indptr[u + 1]
+            position = np.flatnonzero(self.roadmap.indices[begin:stop] == v)[0]
+            edge_ids.append(self.roadmap.edge_ids[begin + position])
+        return np.array(edge_ids, dtype=np.int64)
+
+    def node_point(self, node):
+        """
+        Get the coordinates of a node as a tuple.
+
+        :param node: Node index.
+        :return: Tuple of 3D coordinates.
+        """
+        return tuple(self.nodes[node])
 
     @staticmethod
     def euclidean_distance(point1, point2):
@@ -45,57 +115,267 @@ class PRM:
         """
         return np.linalg.norm(point1 - point2)
 
-    def nearest_point(self, point, nodes):
+    def nearest_point(self, point, blocked=None):
         """
         Find the nearest node to a given point.
         
         :param point: The reference point (3D coordinates as a NumPy array).
-        :param nodes: List of nodes to search.
-        :return: Tuple containing the nearest node and its distance to the reference point.
+        :param blocked: Boolean mask of nodes to skip, or None.
+        :return: Tuple containing the nearest node index (None if there is none) and its distance to the reference point.
         """
-        nearest = None
-        min_distance = float('inf')
-        
-        for node in nodes:
-            distance = self.euclidean_distance(point, np.array(node))  # Convert node back to np.array for distance calculation
-            if distance < min_distance:
-                min_distance = distance
-                nearest = node
-                
-        return nearest, min_distance
+        distances = np.linalg.norm(self.nodes - np.asarray(point, dtype=float), axis=1)
+        if blocked is not None:
+            distances[blocked] = np.inf
+        if len(distances) == 0 or np.isinf(distances.min()):
+            return None, float('inf')
 
-    def bfs(self, start, end, graph):
+        nearest = int(np.argmin(distances))
+        return nearest, distances[nearest]
+
+    def nearest_candidates(self, points, k):
+        """
+        Find the k nearest roadmap nodes of several points in one batched query.
+
+        :param points: (Q, 3) array of reference points.
+        :param k: Number of candidates per point (capped at the number of nodes).
+        :return: (Q, k) array of node indices, nearest first.
+        """
+        _, candidates = self.node_index.query(np.asarray(points, dtype=float).reshape(-1, 3), k)
+        return candidates
+
+    def _unblocked_candidates(self, point, candidates, blocked):
+        """
+        Filter a point's nearest-node candidates down to the unblocked ones.
+
+        Falls back to a full scan for the nearest unblocked node when every candidate is blocked.
+
+        :param point: The reference point (3D coordinates).
+        :param candidates: Candidate node indices, nearest first.
+        :param blocked: Boolean mask of nodes to skip.
+        :return: List of (node index, distance) tuples, nearest first.
+        """
+        point = np.asarray(point, dtype=float)
+        found = [(node, self.euclidean_distance(point, self.nodes[node]))
+                 for node in candidates.tolist() if not blocked[node]]
+        if found:
+            return found
+
+        node, distance = self.nearest_point(point, blocked)
+        return [(node, distance)] if node is not None else []
+
+    def connect(self, start, end, max_radius, obstacles):
+        """
+        Find a collision-free connection between two positions with the configured attach planner.
+
+        :param start: Start position (3D coordinates).
+        :param end: End position (3D coordinates).
+        :param max_radius: Radius of the robot used for collision checking.
+        :param obstacles: List of obstacles to avoid.
+        :return: List of line segments (pairs of points) from start towards end; empty if none was found.
+        """
+        planner = self.config['attach_planner']
+        if planner == 'greedy':
+            return add_nodes(start, end, max_radius, obstacles, config=self.config, edge_gen=self.edge_gen)
+
+        path = RRT_PLANNERS[planner](obstacles, max_radius, config=self.config).plan(start, end)
+        if path is None:
+            return []
+        # End the connection on the given end object so callers can recognise it.
+        path[-1] = end
+        return list(zip(path[:-1], path[1:]))
+
+    def _attach(self, position, candidates, max_radius, obstacles, to_roadmap):
+        """
+        Connect a start or goal position to the roadmap.
+
+        Candidates are tried nearest first; a candidate farther than max_node_distance is
+        reached with connect, and the next one is tried if that does not get through.
+
+        :param position: Start or goal position (3D coordinates).
+        :param candidates: List of (node index, distance) tuples, nearest first.
+        :param max_radius: Maximum radius for adding new nodes.
+        :param obstacles: List of obstacles to avoid when adding new nodes.
+        :param to_roadmap: True to connect position to the node (start), False for node to position (goal).
+        :return: Tuple of the chosen node index (None without candidates) and the connecting path points.
+        """
+        first = None
+        for node, distance in candidates:
+            point = self.node_point(node)
+            if distance <= self.config['max_node_distance']:
+                return node, [point]
+
+            if to_roadmap:
+                connection = self.connect(position, point, max_radius, obstacles)
+                target = point
+            else:
+                connection = self.connect(point, position, max_radius, obstacles)
+                target = position
+            if connection and np.array_equal(connection[-1][1], target):
+                return node, connection
+            if first is None:
+                first = (node, connection)
+
+        return first if first is not None else (None, [])
+
+    def bfs(self, start, end, blocked=None):
         """
         Perform a BFS traversal to find the shortest path from start to end.
         
-        :param start: Start node.
-        :param end: End node.
-        :param graph: Graph to use for traversal.
-        :return: List of nodes representing the shortest path or None if no path exists.
+        :param start: Start node index.
+        :param end: End node index.
+        :param blocked: Boolean mask of nodes the path may not visit, or None.
+        :return: List of node indices representing the shortest path or None if no path exists.
         """
-        if start not in graph or end not in graph:
+        indptr = self.roadmap.indptr
+        if start is None or end is None or indptr[start] == indptr[start + 1] or indptr[end] == indptr[end + 1]:
             return None
 
+        parent = np.full(self.roadmap.num_nodes, -1, dtype=np.int64)
+        if blocked is not None:
+            parent[blocked] = -2
+        parent[start] = start
         queue = deque([start])
-        visited = {start: None}
 
         while queue:
             node = queue.popleft()
             if node == end:
-                path = []
-                while node is not None:
+                path = [node]
+                while node != start:
+                    node = int(parent[node])
                     path.append(node)
-                    node = visited[node]
-                    
                 return path[::-1]
 
-            for neighbor in graph[node]:
-                if neighbor not in visited:
-                    visited[neighbor] = node
+            for neighbor in self.neighbours(node)[0]:
+                if parent[neighbor] == -1:
+                    parent[neighbor] = node
                     queue.append(neighbor)
                     
         return None
 
+    def dijkstra(self, start, end, blocked=None):
+        """
+        Find the shortest path by length from start to end with Dijkstra's algorithm.
+
+        :param start: Start node index.
+        :param end: End node index.
+        :param blocked: Boolean mask of nodes the path may not visit, or None.
+        :return: List of node indices representing the shortest path or None if no path exists.
+        """
+        return self._best_first(start, end, blocked, heuristic=False)
+
+    def astar(self, start, end, blocked=None):
+        """
+        Find the shortest path by length from start to end with A* and a Euclidean heuristic.
+
+        :param start: Start node index.
+        :param end: End node index.
+        :param blocked: Boolean mask of nodes the path may not visit, or None.
+        :return: List of node indices representing the shortest path or None if no path exists.
+        """
+        return self._best_first(start, end, blocked, heuristic=True)
+
+    def _best_first(self, start, end, blocked, heuristic):
+        """
+        Shared binary-heap search over the weighted CSR graph.
+
+        Costs, parents and heuristic values are only kept for the nodes the search touches,
+        so a query on a large (memory-mapped) roadmap does not read or allocate per-node arrays.
+
+        :param start: Start node index.
+        :param end: End node index.
+        :param blocked: Boolean mask of nodes the path may not visit, or None.
+        :param heuristic: Use the straight-line distance to end as A* heuristic.
+        :return: List of node indices representing the shortest path or None if no path exists.
+        """
+        indptr = self.roadmap.indptr
+        if start is None or end is None or indptr[start] == indptr[start + 1] or indptr[end] == indptr[end + 1]:
+            return None
+
+        goal_x, goal_y, goal_z = np.asarray(self.nodes[end], dtype=float).tolist()
+
+        def estimate(nodes):
+            if not heuristic:
+                return [0.0] * len(nodes)
+            # Straight-line distance to the goal, summed and rounded like np.linalg.norm.
+            return [math.sqrt((x - goal_x) * (x - goal_x) + (y - goal_y) * (y - goal_y)
+                              + (z - goal_z) * (z - goal_z))
+                    for x, y, z in self.nodes[nodes].tolist()]
+
+        cost = {start: 0.0}
+        parent = {start: start}
+        closed = set()
+        heap = [(estimate([start])[0], 0.0, start)]
+
+        while heap:
+            _, node_cost, node = heapq.heappop(heap)
+            if node in closed:
+                continue
+            if node == end:
+                path = [node]
+                while node != start:
+                    node = parent[node]
+                    path.append(node)
+                return path[::-1]
+            closed.add(node)
+
+            improved = []
+            for neighbor, length in zip(*self.neighbours(node)):
+                if neighbor in closed or (blocked is not None and blocked[neighbor]):
+                    continue
+                new_cost = node_cost + length
+                if new_cost < cost.get(neighbor, math.inf):
+                    cost[neighbor] = new_cost
+                    parent[neighbor] = node
+                    improved.append((neighbor, new_cost))
+
+            if improved:
+                for (neighbor, new_cost), remaining in zip(improved, estimate([n for n, _ in improved])):
+                    heapq.heappush(heap, (new_cost + remaining, new_cost, neighbor))
+
+        return None
+
+    def search(self, start, end, blocked=None):
+        """
+        Find a path from start to end with the search algorithm selected in the configuration.
+
+        :param start: Start node index.
+        :param end: End node index.
+        :param blocked: Boolean mask of nodes the path may not visit, or None.
+        :return: List of node indices representing the path or None if no path exists.
+        """
+        return getattr(self, self.config['search_algorithm'])(start, end, blocked)
+
+    def lazy_search(self, start, end, blocked, obstacles, max_radius):
+        """
+        Search for a path and, in Lazy PRM mode, collision-check the edges it uses.
+
+        Unchecked edges along the tentative path are validated in one batch and their result
+        is kept on the edge; if any of them is in collision the search is repeated without it.
+
+        :param start: Start node index.
+        :param end: End node index.
+        :param blocked: Boolean mask of nodes the path may not visit, or None.
+        :param obstacles: CollisionChecker or list of obstacles used to check the edges.
+        :param max_radius: Radius of the robot used for collision checking.
+        :return: List of node indices representing a collision-free path or None if no path exists.
+        """
+        while True:
+            path = self.search(start, end, blocked)
+            if path is None or not self.lazy:
+                return path
+
+            edge_ids = self.path_edges(path)
+            unknown = self.edge_state[edge_ids] == EDGE_UNKNOWN
+            if not np.any(unknown):
+                return path
+
+            # Same (smaller, larger) orientation as the candidate edges of the eager edge check.
+            pairs = np.sort(np.column_stack((path[:-1], path[1:])), axis=1)[unknown]
+            valid = self.edge_gen.validate_pairs(np.asarray(self.nodes), pairs, obstacles, max_radius)
+            self.edge_state[edge_ids[unknown]] = np.where(valid, EDGE_VALID, EDGE_INVALID)
+            if np.all(valid):
+                return path
+
     def is_collision_free(self, path, obstacles):
         """
         Check if the given path is collision-free with respect to obstacles.
@@ -117,44 +397,43 @@ class PRM:
         :param robot_configurations: List of tuples containing start and end configurations for each robot.
         :param max_radius: Maximum radius for adding new nodes.
         :param obstacles: List of obstacles to avoid when adding new nodes.
-        :return: List of paths for each robot, or a warning if a path does not exist.
+        :return: List of paths for each robot, None where no path exists. Paths avoid the roadmap
+                 nodes of earlier robots unless share_nodes_on_failure lets a robot without such
+                 a path share them.
         """
         paths = []
+        # Roadmap nodes taken by the paths found so far; later robots may not use them.
+        used_nodes = np.zeros(self.roadmap.num_nodes, dtype=bool)
 
-        for start_pos, end_pos in robot_configurations:
-            # Remove used nodes and create a new graph
-            nodes_remaining = [node for node in self.original_nodes if node not in self.used_nodes]
-            edge_pairs_remaining = [
-                (u, v) for u, v in self.original_edge_pairs
-                if tuple(self.original_nodes[u]) not in self.used_nodes and
-                   tuple(self.original_nodes[v]) not in self.used_nodes
-            ]
-            graph = self._create_graph(nodes_remaining, edge_pairs_remaining)
-
-            start_point, dist_start = self.nearest_point(start_pos, nodes_remaining)
-            end_point, dist_end = self.nearest_point(end_pos, nodes_remaining)
-
-            if dist_start > self.config['max_node_distance']:
-                path_points = add_nodes(start_pos, start_point, max_radius, obstacles)
-            else:
-                path_points = [start_point]
-           
-            
-            if dist_end > self.config['max_node_distance']:
-                end_path_point = add_nodes( end_point,end_pos, max_radius, obstacles)
-            else:
-                end_path_point = [end_point]
+        # Nearest-node candidates of all starts and goals, fetched in one query.
+        positions = np.array([pos for configuration in robot_configurations for pos in configuration], dtype=float)
+        candidates = self.nearest_candidates(positions, self.config['attach_candidates'])
+
+        for robot, (start_pos, end_pos) in enumerate(robot_configurations):
+            start_candidates = self._unblocked_candidates(start_pos, candidates[2 * robot], used_nodes)
+            end_candidates = self._unblocked_candidates(end_pos, candidates[2 * robot + 1], used_nodes)
+
+            start_node, path_points = self._attach(start_pos, start_candidates, max_radius, obstacles, True)
+            end_node, end_path_point = self._attach(end_pos, end_candidates, max_radius, obstacles, False)
                 
-            path = self.bfs(start_point, end_point, graph)
+            path = self.lazy_search(start_node, end_node, used_nodes, obstacles, max_radius)
+            if (path is None and self.config['share_nodes_on_failure'] and start_node is not None
+                    and end_node is not None and used_nodes.any()):
+                # The nodes of earlier robots can cut the roadmap apart; when allowed, share some
+                # of them rather than leave this robot without a path.
+                logging.warning(f"No path between {start_pos} and {end_pos} avoids the nodes of earlier "
+                                f"robots; searching again with those nodes allowed.")
+                path = self.lazy_search(start_node, end_node, None, obstacles, max_radius)
             if path:
-                path_points.extend(path)
+                used_nodes[path] = True
+                path_points.extend(self.node_point(node) for node in path)
                 path_points.extend(end_path_point)
 
                 paths.append(path_points)
                 
 
             else:
-                print(f"Warning: No path exists between {start_point} and {end_point}")
+                logging.warning(f"No path exists between {start_pos} and {end_pos}")
 
                 paths.append(None)
 
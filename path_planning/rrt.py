@@ -1,8 +1,10 @@
+import time
 import numpy as np
-import yaml
 import logging
-from map_generation.collision_detection import check_collision, create_sphere
+from utils import load_config
 from map_generation.edge_generation import EdgeGenerator
+from map_generation.collision_checker import as_collision_checker
+from map_generation.neighbour_index import GridIndex
 
 def euclidean_distance(point1: np.ndarray, point2: np.ndarray) -> float:
     """
@@ -14,88 +16,73 @@ def euclidean_distance(point1: np.ndarray, point2: np.ndarray) -> float:
     """
     return np.linalg.norm(point1 - point2)
 
-def load_config(config_file: str) -> dict:
+def fibonacci_sphere(count):
     """
-    Load configuration settings from a YAML file.
+    Spread unit vectors evenly over the sphere with a Fibonacci lattice.
 
-    :param config_file: Path to the YAML configuration file.
-    :return: A dictionary containing the configuration settings.
+    :param count: Number of directions.
+    :return: (count, 3) array of unit vectors.
     """
-    try:
-        with open(config_file, 'r') as file:
-            return yaml.safe_load(file)
-    except Exception as e:
-        logging.error(f"Failed to load configuration file: {e}")
-        raise
-
-def adjust_direction(direction: np.ndarray, angle: float) -> np.ndarray:
-    """
-    Rotate the direction vector around the Z-axis by the given angle.
-    
-    :param direction: Original direction vector (3D).
-    :param angle: Angle to rotate (in radians).
-    :return: Rotated direction vector.
-    """
-    axis = np.array([0, 0, 1])
-    rotation_matrix = np.array([
-        [np.cos(angle) + axis[0]**2 * (1 - np.cos(angle)),
-         axis[0] * axis[1] * (1 - np.cos(angle)) - axis[2] * np.sin(angle),
-         axis[0] * axis[2] * (1 - np.cos(angle)) + axis[1] * np.sin(angle)],
-        [axis[1] * axis[0] * (1 - np.cos(angle)) + axis[2] * np.sin(angle),
-         np.cos(angle) + axis[1]**2 * (1 - np.cos(angle)),
-         axis[1] * axis[2] * (1 - np.cos(angle)) - axis[0] * np.sin(angle)],
-        [axis[2] * axis[0] * (1 - np.cos(angle)) - axis[1] * np.sin(angle),
-         axis[2] * axis[1] * (1 - np.cos(angle)) + axis[0] * np.sin(angle),
-         np.cos(angle) + axis[2]**2 * (1 - np.cos(angle))]
-    ])
-    return np.dot(rotation_matrix, direction)
-
-def add_nodes(start_pos_, end_pos_, max_radius, obstacles):
+    i = np.arange(count) + 0.5
+    z = 1.0 - 2.0 * i / count
+    radius = np.sqrt(1.0 - z * z)
+    theta = np.pi * (1.0 + np.sqrt(5.0)) * i
+    return np.column_stack((radius * np.cos(theta), radius * np.sin(theta), z))
+
+
+# Candidate escape directions tried by add_nodes when the step towards the goal is blocked.
+ESCAPE_DIRECTIONS = fibonacci_sphere(64)
+
+# add_nodes gives up after this many times the number of straight-line steps.
+MAX_WALK_FACTOR = 10
+
+
+def add_nodes(start_pos_, end_pos_, max_radius, obstacles, config=None, edge_gen=None):
     """
     Add nodes to the graph if the path between them is collision-free.
     Gradually move from start_pos to end_pos to create a tree and check if the path is collision-free.
+
+    When the step towards end_pos is blocked, the step is taken in the free direction among
+    ESCAPE_DIRECTIONS closest to end_pos (or to the previous escape step) that does not lead
+    back to a visited position; all candidate positions are checked in one batch.
     
     :param start_pos_: Starting position (3D coordinates).
     :param end_pos_: Ending position (3D coordinates).
     :param max_radius: Maximum radius for collision checking.
     :param obstacles: List of obstacles.
+    :param config: Loaded configuration; config.yaml is read if None.
+    :param edge_gen: EdgeGenerator to check with; created from config if None.
     :return: List of new nodes and edge pairs added.
     """
-    start_pos = np.array(start_pos_)
-    end_pos = np.array(end_pos_)
+    start_pos = np.array(start_pos_, dtype=float)
+    end_pos = np.array(end_pos_, dtype=float)
     
     return_points = []
 
-    # Load configuration and initialize edge generator
-    config_file = "config.yaml"
-    config = load_config(config_file)
-    edge_gen = EdgeGenerator(config_file=config_file)
+    if config is None:
+        config = load_config("config.yaml")
+    if edge_gen is None:
+        edge_gen = EdgeGenerator(config_file=None, config=config)
+    checker = as_collision_checker(obstacles)
 
     # Check if the start and end positions are collision-free
-    if not edge_gen.check_node_collision(start_pos, obstacles, max_radius):
+    if not edge_gen.check_node_collision(start_pos, checker, max_radius):
         logging.warning(f"Start position {start_pos_} is in collision.")
         return return_points
 
-    if not edge_gen.check_node_collision(end_pos, obstacles, max_radius):
+    if not edge_gen.check_node_collision(end_pos, checker, max_radius):
         logging.warning(f"End position {end_pos_} is in collision.")
         return return_points
 
-    '''
-    # Check if the direct path between start and end is collision-free
-    if edge_gen.is_collision_free_path(start_pos, end_pos,
-                                       config['point_check_distance'], obstacles, max_radius):
-        return_points.append((start_pos_, end_pos_))
-        logging.info(f"Direct path from {start_pos_} to {end_pos_} is collision-free.")
-        return return_points
-    '''
-
-    # If direct path is not collision-free, attempt to find a path by adjusting the direction
-    
     current_pos = start_pos
-    direction = end_pos - start_pos
-    distance = np.linalg.norm(direction)
+    distance = np.linalg.norm(end_pos - start_pos)
+    max_steps = MAX_WALK_FACTOR * (int(np.ceil(distance / config['node_steps'])) + 1)
+    escape_direction = None
+
+    for _ in range(max_steps):
+        if np.linalg.norm(current_pos - end_pos) <= config['point_check_distance']:
+            break
 
-    while np.linalg.norm(current_pos - end_pos) > config['point_check_distance']:
         step = min(config['node_steps'], distance)
         direction = end_pos - current_pos
         distance = np.linalg.norm(direction)
@@ -103,29 +90,378 @@ def add_nodes(start_pos_, end_pos_, max_radius, obstacles):
         if distance < step:
             step = distance
         
-        new_pos = current_pos + (direction / distance) * step
-
-        # Check if the new position is collision-free
-        if edge_gen.check_node_collision(new_pos, obstacles, max_radius):
-            return_points.append((tuple(current_pos), tuple(new_pos)))
-            current_pos = new_pos
-        else:
-            logging.debug(f"Position {new_pos} is in collision. Adjusting direction...")
-            for angle in np.linspace(0, 2 * np.pi, num=36):
-                rotated_direction = adjust_direction(direction, angle)
-                new_pos = current_pos + (rotated_direction / np.linalg.norm(rotated_direction)) * step
-
-                if edge_gen.check_node_collision(new_pos, obstacles, max_radius):
-                    return_points.append((tuple(current_pos), tuple(new_pos)))
-                    current_pos = new_pos
-                    break
-            else:
-                logging.error(f"No collision-free position found. Adjusting path failed.")
-                break
+        # The step towards the goal comes first. The escape directions follow, closest to the goal
+        # first, or closest to the previous escape step while still blocked, so the walk slides
+        # along an obstacle until the goal direction is free.
+        goal_direction = direction / distance
+        preferred = goal_direction if escape_direction is None else escape_direction
+        escapes = ESCAPE_DIRECTIONS[np.argsort(-(ESCAPE_DIRECTIONS @ preferred), kind='stable')]
+        candidates = current_pos + np.vstack((goal_direction, escapes)) * step
+        free = ~checker.collision_mask(candidates, max_radius)
+        # Do not step back next to a position already visited, so the walk cannot oscillate
+        # in front of an obstacle.
+        visited = np.array([segment[0] for segment in return_points] + [current_pos])
+        revisits = np.min(np.linalg.norm(candidates[:, None, :] - visited[None, :, :], axis=2), axis=1) < 0.5 * step
+        free[1:] &= ~revisits[1:]
+
+        if not np.any(free):
+            logging.error(f"No collision-free position found. Adjusting path failed.")
+            break
+        if not free[0]:
+            logging.debug(f"Position {candidates[0]} is in collision. Adjusting direction...")
+
+        chosen = int(np.argmax(free))
+        new_pos = candidates[chosen]
+        escape_direction = None if chosen == 0 else escapes[chosen - 1]
+        return_points.append((tuple(current_pos), tuple(new_pos)))
+        current_pos = new_pos
+    else:
+        logging.error(f"No path to {end_pos_} found within {max_steps} steps. Adjusting path failed.")
 
     # Add final edge from last position to end_pos
-    if edge_gen.is_collision_free_path(current_pos, end_pos, config['point_check_distance'], obstacles, max_radius):
+    if edge_gen.is_collision_free_path(current_pos, end_pos, config['point_check_distance'], checker, max_radius):
         return_points.append((tuple(current_pos), end_pos_))
         
   
     return return_points
+
+
+class RRT:
+    """
+    Single-query Rapidly-exploring Random Tree planner.
+
+    Samples are drawn in blocks: the nearest tree vertices of a whole block are found with
+    one query of an incremental grid index, and all extensions of the block are
+    collision-checked in one batched call before the free ones are added to the tree.
+
+    Attributes:
+        config (dict): Configuration parameters.
+        obstacles (CollisionChecker): Collision checker over the obstacles.
+        max_radius (float): Radius of the robot used for collision checking.
+        step_size (float): Maximum length of one tree extension.
+        edge_gen (EdgeGenerator): Edge generator used for the batched segment checks.
+    """
+
+    def __init__(self, obstacles, max_radius, config_file="config.yaml", config=None):
+        """
+        Initialize the planner.
+
+        :param obstacles: CollisionChecker or list of obstacles.
+        :param max_radius: Radius of the robot used for collision checking.
+        :param config_file: Path to the configuration file.
+        :param config: Already loaded configuration; config_file is not read when given.
+        """
+        self.config = config if config is not None else load_config(config_file)
+        self.obstacles = as_collision_checker(obstacles)
+        self.max_radius = max_radius
+        self.step_size = self.config['rrt_step_size']
+        self.edge_gen = EdgeGenerator(config_file=None, config=self.config)
+        self.workspace_min = np.array(self.config['WORKSPACE_MIN'], dtype=float)
+        self.workspace_max = np.array(self.config['WORKSPACE_MAX'], dtype=float)
+
+    def new_tree(self, root):
+        """
+        Create a tree holding only its root.
+
+        :param root: Root position (3D coordinates).
+        :return: Tuple of the vertex index and the list of parent indices (the root is its own parent).
+        """
+        index = GridIndex(np.asarray(root, dtype=float).reshape(1, 3), cell_size=self.step_size)
+        return index, [0]
+
+    def segments_free(self, starts, ends):
+        """
+        Collision-check a batch of straight motions.
+
+        :param starts: (M, 3) array of start points.
+        :param ends: (M, 3) array of end points.
+        :return: Boolean array of shape (M,), True where the motion is collision-free.
+        """
+        return self.edge_gen.validate_segments(starts, ends, self.obstacles, self.max_radius)
+
+    def sample(self, count, goal):
+        """
+        Draw random positions in the workspace, replacing some of them by the goal.
+
+        :param count: Number of samples.
+        :param goal: Goal position (3D coordinates).
+        :return: (count, 3) array of samples.
+        """
+        samples = np.random.uniform(self.workspace_min, self.workspace_max, (count, 3))
+        samples[np.random.rand(count) < self.config['rrt_goal_bias']] = goal
+        return samples
+
+    def steer(self, origins, targets):
+        """
+        Move from each origin towards its target by at most the step size.
+
+        :param origins: (M, 3) array of origins.
+        :param targets: (M, 3) array of targets.
+        :return: (M, 3) array of new positions and (M,) array of the distances moved.
+        """
+        direction = targets - origins
+        distance = np.linalg.norm(direction, axis=1)
+        moved = np.minimum(distance, self.step_size)
+        scale = np.divide(moved, distance, out=np.zeros_like(distance), where=distance > 0)
+        return origins + direction * scale[:, None], moved
+
+    @staticmethod
+    def trace(index, parents, vertex):
+        """
+        Follow the parent links from a vertex back to the root.
+
+        :param index: Vertex index of the tree.
+        :param parents: Parent index of every vertex.
+        :param vertex: Vertex to start from.
+        :return: List of vertex positions from the root to the vertex.
+        """
+        path = [vertex]
+        while parents[path[-1]] != path[-1]:
+            path.append(parents[path[-1]])
+        return [tuple(index.points[v]) for v in reversed(path)]
+
+    def _endpoints_free(self, start, goal):
+        start_free, goal_free = ~self.obstacles.collision_mask(np.array([start, goal]), self.max_radius)
+        if not start_free:
+            logging.warning(f"Start position {tuple(start)} is in collision.")
+        if not goal_free:
+            logging.warning(f"Goal position {tuple(goal)} is in collision.")
+        return start_free and goal_free
+
+    def plan(self, start, goal):
+        """
+        Search a collision-free path from start to goal.
+
+        :param start: Start position (3D coordinates).
+        :param goal: Goal position (3D coordinates).
+        :return: List of positions from start to goal, or None if no path was found in time.
+        """
+        start = np.asarray(start, dtype=float)
+        goal = np.asarray(goal, dtype=float)
+        if not self._endpoints_free(start, goal):
+            return None
+        if self.segments_free(start[None], goal[None])[0]:
+            return [tuple(start), tuple(goal)]
+
+        index, parents = self.new_tree(start)
+        batch = self.config['rrt_batch_size']
+        for _ in range(0, self.config['rrt_max_iterations'], batch):
+            samples = self.sample(batch, goal)
+            _, nearest = index.query(samples, 1)
+            nearest = nearest[:, 0]
+            origins = index.points[nearest]
+            new_points, moved = self.steer(origins, samples)
+            free = self.segments_free(origins, new_points) & (moved > 0)
+
+            added = []
+            for parent, point in zip(nearest[free].tolist(), new_points[free]):
+                added.append(index.insert(point))
+                parents.append(parent)
+            if not added:
+                continue
+
+            # Try to finish from every new vertex within a step of the goal.
+            added = np.array(added)
+            close = added[np.linalg.norm(index.points[added] - goal, axis=1) <= self.step_size]
+            if len(close):
+                reached = close[self.segments_free(index.points[close], np.repeat(goal[None], len(close), axis=0))]
+                if len(reached):
+                    return self.trace(index, parents, int(reached[0])) + [tuple(goal)]
+
+        logging.warning(f"RRT found no path from {tuple(start)} to {tuple(goal)} "
+                        f"in {self.config['rrt_max_iterations']} iterations.")
+        return None
+
+
+class RRTConnect(RRT):
+    """
+    Bidirectional RRT-Connect planner.
+
+    Trees grow from the start and from the goal in turns. After one tree is extended
+    towards a random sample, the other tree is pulled towards the new vertex in a straight
+    line: all steps of that line are collision-checked in one batched call and the free
+    prefix is added. The search ends when the line reaches the new vertex.
+    """
+
+    def connect(self, index, parents, target):
+        """
+        Grow a tree straight towards a target for as long as the motion is free.
+
+        :param index: Vertex index of the tree.
+        :param parents: Parent index of every vertex.
+        :param target: Target position (3D coordinates).
+        :return: Index of the last added vertex (or the nearest vertex) and whether the target was reached.
+        """
+        _, nearest = index.query(target[None], 1)
+        vertex = int(nearest[0, 0])
+        origin = index.points[vertex].copy()
+        distance = np.linalg.norm(target - origin)
+        if distance == 0:
+            return vertex, True
+
+        steps = int(np.ceil(distance / self.step_size))
+        waypoints = origin + (target - origin) * (np.arange(steps + 1) / steps)[:, None]
+        free = self.segments_free(waypoints[:-1], waypoints[1:])
+        reachable = steps if np.all(free) else int(np.argmin(free))
+
+        for point in waypoints[1:reachable + 1]:
+            parents.append(vertex)
+            vertex = index.insert(point)
+        return vertex, reachable == steps
+
+    def plan(self, start, goal):
+        start = np.asarray(start, dtype=float)
+        goal = np.asarray(goal, dtype=float)
+        if not self._endpoints_free(start, goal):
+            return None
+        if self.segments_free(start[None], goal[None])[0]:
+            return [tuple(start), tuple(goal)]
+
+        trees = [self.new_tree(start), self.new_tree(goal)]
+        for iteration in range(self.config['rrt_max_iterations']):
+            (index, parents), (other_index, other_parents) = trees
+            target = goal if iteration % 2 == 0 else start
+            sample = self.sample(1, target)
+            _, nearest = index.query(sample, 1)
+            vertex = int(nearest[0, 0])
+            new_point, moved = self.steer(index.points[vertex][None], sample)
+            if moved[0] > 0 and self.segments_free(index.points[vertex][None], new_point)[0]:
+                parents.append(vertex)
+                new_vertex = index.insert(new_point[0])
+
+                other_vertex, reached = self.connect(other_index, other_parents, new_point[0])
+                if reached:
+                    path = self.trace(index, parents, new_vertex)
+                    other_path = self.trace(other_index, other_parents, other_vertex)
+                    # The connecting vertex appears at the end of both halves.
+                    path = path + other_path[::-1][1:]
+                    return path if iteration % 2 == 0 else path[::-1]
+
+            trees.reverse()
+
+        logging.warning(f"RRT-Connect found no path from {tuple(start)} to {tuple(goal)} "
+                        f"in {self.config['rrt_max_iterations']} iterations.")
+        return None
+
+
+class RRTStar(RRT):
+    """
+    Anytime RRT* planner.
+
+    Every new vertex is connected to the cheapest vertex within a shrinking radius and
+    then used to rewire its neighbours, so the best path keeps improving as samples are
+    added. Planning stops at a wall-clock or iteration budget and returns the best path
+    found; every improvement is reported through an optional callback.
+    """
+
+    def rewire_radius(self, num_vertices):
+        """
+        Neighbourhood radius for a tree of a given size.
+
+        :param num_vertices: Number of vertices in the tree.
+        :return: gamma * (log n / n)^(1/3), capped at twice the step size.
+        """
+        n = num_vertices + 1
+        return min(self.config['rrt_star_gamma'] * (np.log(n) / n) ** (1.0 / 3.0), 2.0 * self.step_size)
+
+    def plan(self, start, goal, time_budget=None, max_iterations=None, callback=None):
+        """
+        Search a collision-free path from start to goal and keep shortening it until the budget is used.
+
+        :param start: Start position (3D coordinates).
+        :param goal: Goal position (3D coordinates).
+        :param time_budget: Wall-clock budget in seconds; rrt_star_time_budget from the config if None.
+        :param max_iterations: Sample budget; rrt_max_iterations from the config if None.
+        :param callback: Called as callback(path, cost) whenever a shorter path is found.
+        :return: List of positions from start to goal, or None if no path was found within the budget.
+        """
+        time_start = time.perf_counter()
+        if time_budget is None:
+            time_budget = self.config['rrt_star_time_budget']
+        if max_iterations is None:
+            max_iterations = self.config['rrt_max_iterations']
+
+        start = np.asarray(start, dtype=float)
+        goal = np.asarray(goal, dtype=float)
+        if not self._endpoints_free(start, goal):
+            return None
+        if self.segments_free(start[None], goal[None])[0]:
+            path = [tuple(start), tuple(goal)]
+            if callback is not None:
+                callback(path, float(np.linalg.norm(goal - start)))
+            return path
+
+        index, parents = self.new_tree(start)
+        costs = [0.0]
+        children = [[]]
+        goal_vertices = []
+        best_vertex, best_cost = None, np.inf
+
+        for _ in range(max_iterations):
+            if time_budget is not None and time.perf_counter() - time_start >= time_budget:
+                break
+
+            sample = self.sample(1, goal)
+            _, nearest = index.query(sample, 1)
+            new_point, moved = self.steer(index.points[nearest[0]], sample)
+            new_point = new_point[0]
+            if moved[0] == 0:
+                continue
+
+            near = index.query_radius(new_point[None], self.rewire_radius(len(index)))[0]
+            near = np.union1d(near, nearest[0])
+            near_points = index.points[near]
+            distances = np.linalg.norm(near_points - new_point, axis=1)
+
+            # Motions into and out of the new vertex, checked in one batch.
+            repeated = np.repeat(new_point[None], len(near), axis=0)
+            free = self.segments_free(np.vstack((near_points, repeated)), np.vstack((repeated, near_points)))
+            free_in, free_out = free[:len(near)], free[len(near):]
+            if not np.any(free_in):
+                continue
+
+            near_costs = np.array([costs[v] for v in near.tolist()])
+            candidate_costs = np.where(free_in, near_costs + distances, np.inf)
+            parent = int(near[np.argmin(candidate_costs)])
+            new_vertex = index.insert(new_point)
+            parents.append(parent)
+            costs.append(float(candidate_costs.min()))
+            children.append([])
+            children[parent].append(new_vertex)
+
+            # Rewire neighbours that are cheaper to reach through the new vertex.
+            for v, distance, reachable in zip(near.tolist(), distances.tolist(), free_out.tolist()):
+                improvement = costs[v] - (costs[new_vertex] + distance)
+                if reachable and v != parent and improvement > 1e-12:
+                    children[parents[v]].remove(v)
+                    parents[v] = new_vertex
+                    children[new_vertex].append(v)
+                    subtree = [v]
+                    while subtree:
+                        w = subtree.pop()
+                        costs[w] -= improvement
+                        subtree.extend(children[w])
+
+            if np.linalg.norm(goal - new_point) <= self.step_size and self.segments_free(new_point[None], goal[None])[0]:
+                goal_vertices.append(new_vertex)
+
+            if goal_vertices:
+                goal_costs = [costs[v] + np.linalg.norm(goal - index.points[v]) for v in goal_vertices]
+                candidate = int(np.argmin(goal_costs))
+                if goal_costs[candidate] < best_cost - 1e-9:
+                    best_vertex, best_cost = goal_vertices[candidate], goal_costs[candidate]
+                    if callback is not None:
+                        callback(self.trace(index, parents, best_vertex) + [tuple(goal)], float(best_cost))
+
+        if best_vertex is None:
+            logging.warning(f"RRT* found no path from {tuple(start)} to {tuple(goal)} within its budget.")
+            return None
+        return self.trace(index, parents, best_vertex) + [tuple(goal)]
+
+
+# Planners selectable through the 'planner' and 'attach_planner' config keys.
+RRT_PLANNERS = {
+    'rrt': RRT,
+    'rrt_connect': RRTConnect,
+    'rrt_star': RRTStar,
+}
@@ -0,0 +1,268 @@
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from motion_planning_inputs import MotionPlanningInput
+from utils import load_config, validate_config, setup_logging, path_corrector
+from visualizer.scene import create_scene
+from map_generation.map_generation import MapGenerator
+from path_planning.prm import PRM
+from path_planning.path_shortcutting import PathShortcutter
+from path_planning.equal_step_path_generator import make_equal_steps
+
+
+class PlanningScene:
+    """
+    Everything needed to answer path queries in one scene: the collision structures,
+    the roadmap and the PRM graph over it.
+
+    Attributes:
+        input_file (str): Input file the scene was loaded from.
+        obstacle_data (np.ndarray): (M, 4) array of (center_x, center_y, center_z, side_length) obstacles.
+        max_radius (float): Robot radius the roadmap was built for.
+        collision_checker (CollisionChecker): Collision checker over the obstacles.
+        prm (PRM): Planner over the roadmap.
+        config (dict): Configuration the scene was built with.
+    """
+
+    def __init__(self, input_file, config_file="config.yaml", config=None):
+        """
+        Load a scene and build its roadmap.
+
+        :param input_file: Path to an input file in the run_motion_planning format; its robots
+                           set the radius the roadmap is built for.
+        :param config_file: Path to the configuration file.
+        :param config: Already loaded configuration; config_file is not read when given.
+        """
+        if config is None:
+            config = validate_config(load_config(config_file))
+        mpi = MotionPlanningInput(input_file)
+        mpi.read_input_file()
+        data = mpi.get_data()
+
+        self.input_file = input_file
+        self.obstacle_data = data['obstacles']
+        self.max_radius = max(data['robot_radii']) + 0.01
+        _, self.collision_checker = create_scene(self.obstacle_data, visualize=False, config=config)
+
+        map_gen = MapGenerator(config=config)
+        nodes, _, edges_pair = map_gen.generate_map(self.collision_checker, self.max_radius, self.obstacle_data)
+        self.prm = PRM(nodes, edges_pair, config=config)
+        self.config = config
+
+    def plan(self, robot_configurations, max_radius=None):
+        """
+        Plan paths for a set of robots.
+
+        :param robot_configurations: List of (start, goal) pairs of 3D coordinates.
+        :param max_radius: Robot radius; defaults to the radius the roadmap was built for.
+        :return: List with one path (list of 3D points) per robot, None where no path exists.
+                 When every robot has a path, the paths have equal numbers of steps.
+        """
+        if max_radius is None:
+            max_radius = self.max_radius
+        if max_radius > self.max_radius:
+            raise ValueError(f"Robot radius {max_radius} exceeds the radius {self.max_radius} "
+                             f"the roadmap was built for.")
+
+        paths = self.prm.get_path(robot_configurations, max_radius, self.collision_checker)
+        found = [index for index, path in enumerate(paths) if path is not None]
+        corrected = path_corrector([paths[index] for index in found])
+        corrected = PathShortcutter(self.collision_checker, max_radius, config=self.config).shortcut(corrected)
+        if len(found) == len(paths):
+            corrected = make_equal_steps(corrected)
+
+        results = [None] * len(paths)
+        for index, path in zip(found, corrected):
+            results[index] = [[float(coord) for coord in point] for point in path]
+        return results
+
+
+class PlanningService:
+    """
+    Resident planner that keeps a scene loaded and answers path queries against it.
+
+    Queries run on a pool of worker threads; a reload builds the new scene off to the side
+    and swaps it in, so queries in flight finish on the scene they started with.
+
+    Attributes:
+        config_file (str): Path to the configuration file.
+        config (dict): Configuration shared by every scene the service loads.
+        scene (PlanningScene): Currently loaded scene.
+        executor (ThreadPoolExecutor): Worker pool running the queries.
+    """
+
+    def __init__(self, input_file, config_file="config.yaml", workers=4, config=None):
+        """
+        Initialize the service and load its first scene.
+
+        :param input_file: Path to the input file of the first scene.
+        :param config_file: Path to the configuration file.
+        :param workers: Number of worker threads answering queries.
+        :param config: Already loaded configuration; config_file is not read when given.
+        """
+        self.config_file = config_file
+        self.config = config if config is not None else validate_config(load_config(config_file))
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.scene = None
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self.reload(input_file)
+
+    def reload(self, input_file=None):
+        """
+        Load a scene, replacing the current one.
+
+        :param input_file: Path to the input file; reloads the current scene if None.
+        :return: Summary of the loaded scene.
+        """
+        if input_file is None:
+            input_file = self.scene.input_file
+
+        time_start = time.perf_counter()
+        scene = PlanningScene(input_file, config=self.config)
+        with self._lock:
+            self.scene = scene
+        elapsed = time.perf_counter() - time_start
+        logging.info(f"Loaded scene {input_file} in {elapsed:.3f} seconds")
+        return dict(self.describe(), load_seconds=elapsed)
+
+    def describe(self):
+        """
+        Summarize the service state.
+
+        :return: Dictionary with the loaded scene and the number of requests served.
+        """
+        scene = self.scene
+        return {
+            'input_file': scene.input_file,
+            'num_obstacles': len(scene.obstacle_data),
+            'num_nodes': scene.prm.roadmap.num_nodes,
+            'num_edges': scene.prm.roadmap.num_edges,
+            'max_radius': scene.max_radius,
+            'requests_served': self.requests_served,
+        }
+
+    def plan(self, request):
+        """
+        Answer a plan request on the worker pool.
+
+        :param request: Dictionary with 'robots', a list of {'start': [x, y, z], 'goal': [x, y, z]},
+                        and an optional 'radius'.
+        :return: Dictionary with the paths and the planning latency in milliseconds.
+        """
+        robots = request['robots']
+        robot_configurations = [(tuple(map(float, robot['start'])), tuple(map(float, robot['goal'])))
+                                for robot in robots]
+        for start, goal in robot_configurations:
+            if len(start) != 3 or len(goal) != 3:
+                raise ValueError("Robot start and goal must have three coordinates.")
+        radius = request.get('radius')
+
+        scene = self.scene
+        time_start = time.perf_counter()
+        paths = self.executor.submit(scene.plan, robot_configurations,
+                                     None if radius is None else float(radius)).result()
+        latency = (time.perf_counter() - time_start) * 1000.0
+
+        with self._lock:
+            self.requests_served += 1
+        logging.info(f"Planned {len(robots)} robots in {latency:.1f} ms")
+        return {'paths': paths, 'latency_ms': latency}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class PlanningRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON-over-HTTP front end of a PlanningService.
+
+    Endpoints:
+        GET  /health  Service and scene summary.
+        POST /plan    Plan paths; see PlanningService.plan for the request body.
+        POST /reload  Reload the scene, optionally from {'input_file': path}.
+    """
+
+    service = None
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length == 0:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, dict(self.service.describe(), status='ok'))
+        else:
+            self._send_json(404, {'error': f"Unknown endpoint '{self.path}'."})
+
+    def do_POST(self):
+        time_start = time.perf_counter()
+        try:
+            request = self._read_json()
+            if self.path == '/plan':
+                response = self.service.plan(request)
+            elif self.path == '/reload':
+                response = self.service.reload(request.get('input_file'))
+            else:
+                self._send_json(404, {'error': f"Unknown endpoint '{self.path}'."})
+                return
+        except KeyError as e:
+            logging.error(f"Rejected {self.path} request: missing field {e}")
+            self._send_json(400, {'error': f"Missing field {e}."})
+            return
+        except (TypeError, ValueError, FileNotFoundError) as e:
+            logging.error(f"Rejected {self.path} request: {e}")
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            logging.error(f"An error occurred while handling {self.path}: {e}")
+            self._send_json(500, {'error': str(e)})
+            return
+
+        response['request_ms'] = (time.perf_counter() - time_start) * 1000.0
+        self._send_json(200, response)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} - {format % args}")
+
+
+def serve(config_file="config.yaml"):
+    """
+    Run the planning service until interrupted.
+
+    The first entry of input_file is loaded as the initial scene.
+
+    :param config_file: Path to the configuration file.
+    """
+    config = validate_config(load_config(config_file))
+    service = PlanningService(config['input_file'][0], config_file=config_file,
+                              workers=config['service_workers'], config=config)
+
+    PlanningRequestHandler.service = service
+    server = ThreadingHTTPServer((config['service_host'], config['service_port']), PlanningRequestHandler)
+    logging.info(f"Planning service listening on {config['service_host']}:{config['service_port']}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    serve("config.yaml")
@@ -1,95 +1,287 @@
+import time
+_import_start = time.perf_counter()
+
 import logging
 from motion_planning_inputs import MotionPlanningInput
-from utils import load_config, setup_logging, path_corrector
+from utils import load_config, validate_config, setup_logging, path_corrector
 from visualizer.scene import create_scene
 #from map_generation.node_generation import generate_nodes #, get_collision_free_edges
 from map_generation.map_generation import MapGenerator
-from visualizer.roadmap_visualizer import GraphVisualizer
 from path_planning.prm import PRM
-from visualizer.path_visualizer import PathVisualizer
+from path_planning.rrt import RRT_PLANNERS
+from path_planning.path_shortcutting import PathShortcutter
 from path_planning.equal_step_path_generator import make_equal_steps
 from motion_planning_output import save_paths_to_file
-import time
+from map_generation.roadmap import Roadmap, ROADMAP_ARRAY_NAMES
+from map_generation.roadmap_cache import RoadmapCache
+from map_generation.shared_arrays import share_array, attach_array, release_arrays
+from concurrent.futures import ProcessPoolExecutor
 from analysis.time_analysis import save_statistics
+# The open3d visualizers are imported only when a visualize_* flag asks for them.
 
+IMPORT_SECONDS = time.perf_counter() - _import_start
 
-def main(input_file, output_file):
 
-    setup_logging()  
-    config_file = "config.yaml"  
+# Planners of a batch worker process, keyed by the shared roadmap they search.
+_batch_planners = {}
 
-    try:
-       
-        config = load_config(config_file)
-        if not input_file or not output_file:
-            logging.error("Input or output file path not specified in the config file.")
-            raise ValueError("Missing input or output file path in config.")
-        
-        mpi = MotionPlanningInput(input_file)
-        mpi.read_input_file()
-        data = mpi.get_data()
-        logging.info(f"Parsed Data: {data}")
-       
-        # Create the scene with obstacles
-        obstacles = create_scene(data['obstacles'], visualize = config["visualize_obstacles"])
-
-        map_gen = MapGenerator(config_file="config.yaml")
-        nodes, edges, edges_pair = map_gen.generate_map(obstacles, 
+
+def run_scenario(input_file, output_file, config_file="config.yaml", prm=None, config=None):
+    """
+    Plan the paths of one input file and write them to its output file.
+
+    :param input_file: Path to the input file.
+    :param output_file: Path to the output file.
+    :param config_file: Path to the configuration file.
+    :param prm: PRM over a roadmap built for this scene; the roadmap is generated if None.
+    :param config: Already loaded configuration; config_file is not read when given.
+    :raises Exception: Any error of the scenario, so callers can isolate failures.
+    """
+    if config is None:
+        config = validate_config(load_config(config_file))
+    if not input_file or not output_file:
+        logging.error("Input or output file path not specified in the config file.")
+        raise ValueError("Missing input or output file path in config.")
+    
+    mpi = MotionPlanningInput(input_file)
+    mpi.read_input_file()
+    data = mpi.get_data()
+    logging.info(f"Parsed Data: {data}")
+   
+    # Create the scene with obstacles
+    obstacles, collision_checker = create_scene(data['obstacles'], visualize = config["visualize_obstacles"], config=config)
+
+    if config['planner'] != 'prm':
+        if config['planner'] not in RRT_PLANNERS:
+            raise ValueError(f"Unknown planner '{config['planner']}', expected 'prm' or one of {tuple(RRT_PLANNERS)}.")
+
+        # Single-query planning: every robot gets its own tree, no roadmap is built.
+        logging.info(f"Planning every robot with {config['planner']}")
+        planner = RRT_PLANNERS[config['planner']](collision_checker, max(data['robot_radii']) + 0.01, config=config)
+        paths = [planner.plan(start, goal) for start, goal in data['initial_goal_configs']]
+        prm = None
+
+    elif prm is None:
+        map_gen = MapGenerator(config=config)
+        nodes, edges, edges_pair = map_gen.generate_map(collision_checker, 
                                             max(data['robot_radii']) + 0.01,
                                             data['obstacles'])
         logging.info(f"Successfully generated nodes and edges")
+
+        if config['roadmap_file']:
+            map_gen.save_roadmap(config['roadmap_file'], nodes, edges_pair)
+            logging.info(f"Roadmap saved to {config['roadmap_file']}")
          
         if config['visualize_road_map']:
             logging.info(f"Visualizing the roadmap along with obstacles ")
-            visualizer = GraphVisualizer(nodes, edges_pair, data['obstacles'])
+            from visualizer.roadmap_visualizer import GraphVisualizer
+            shown_edges = edges_pair
+            if config['lazy_prm']:
+                # Lazy PRM edges are unchecked candidates, not roadmap edges; only show the nodes.
+                logging.warning("Roadmap edges are unchecked in Lazy PRM mode; showing the nodes only.")
+                shown_edges = []
+            visualizer = GraphVisualizer(nodes, shown_edges, data['obstacles'])
             visualizer.visualize()
 
+        prm = PRM(nodes, edges_pair, config=config)
+
+    if prm is not None:
         logging.info(f"Generating the optimal path for all the robots")
-    
-        prm = PRM(nodes, edges_pair)
+
         paths = prm.get_path(data['initial_goal_configs'],
-                              max(data['robot_radii']) + 0.01, obstacles) #, max(data['robot_radii']))
-        
-        #path_generator = PathGenerator(paths)
-        #paths = path_generator.make_equal_steps()
-        #paths = make_equal_steps(paths)
-        #exit()
-
-        paths = path_corrector(paths)
-        final_paths = make_equal_steps(paths)
-        
-        if config['visualize_movement']:
-            logging.info(f"Visualizing the suggested path constructed ")
-            visualizer = PathVisualizer(final_paths, data['obstacles'])
-            visualizer.visualize()
+                              max(data['robot_radii']) + 0.01, collision_checker) #, max(data['robot_radii']))
+    
+    #path_generator = PathGenerator(paths)
+    #paths = path_generator.make_equal_steps()
+    #paths = make_equal_steps(paths)
+    #exit()
+
+    # A plan missing a robot is not a plan; fail the scenario instead of writing a partial file.
+    missing = [robot for robot, path in enumerate(paths) if path is None]
+    if missing:
+        raise RuntimeError(f"No path found for robots {missing} in {input_file}.")
+
+    paths = path_corrector(paths)
+    shortcutter = PathShortcutter(collision_checker, max(data['robot_radii']) + 0.01, config=config)
+    paths = shortcutter.shortcut(paths)
+    final_paths = make_equal_steps(paths)
+    
+    if config['visualize_movement']:
+        logging.info(f"Visualizing the suggested path constructed ")
+        from visualizer.path_visualizer import PathVisualizer
+        visualizer = PathVisualizer(final_paths, data['obstacles'])
+        visualizer.visualize()
+
+    save_paths_to_file(final_paths, output_file, config['output_format'])
+    logging.info(f"Motion planning completed. Results saved to {output_file}")
 
-        save_paths_to_file(final_paths, output_file)
-        logging.info(f"Motion planning completed. Results saved to {output_file}")
+
+def main(input_file, output_file, config=None):
+
+    setup_logging()  
+    config_file = "config.yaml"  
+
+    try:
+        run_scenario(input_file, output_file, config_file, config=config)
 
     except Exception as e:
         logging.error(f"An error occurred during the execution: {e}")
 
+
+def scene_key(input_file, config):
+    """
+    Key identifying the roadmap an input file needs: its obstacles, robot radius and roadmap settings.
+
+    :param input_file: Path to the input file.
+    :param config: Configuration dictionary.
+    :return: Hex digest shared by scenarios that can use the same roadmap.
+    """
+    mpi = MotionPlanningInput(input_file)
+    mpi.read_input_file()
+    data = mpi.get_data()
+    return RoadmapCache.make_key(data['obstacles'], max(data['robot_radii']) + 0.01,
+                                 config['WORKSPACE_MIN'], config['WORKSPACE_MAX'], config)
+
+
+def _build_batch_roadmap(input_file, config):
+    """
+    Generate the roadmap of a scene in a batch worker process.
+
+    :param input_file: Path to an input file of the scene.
+    :param config: Configuration dictionary.
+    :return: Dictionary of the Roadmap arrays.
+    """
+    mpi = MotionPlanningInput(input_file)
+    mpi.read_input_file()
+    data = mpi.get_data()
+    _, collision_checker = create_scene(data['obstacles'], visualize=False, config=config)
+
+    map_gen = MapGenerator(config=config)
+    nodes, _, edges_pair = map_gen.generate_map(collision_checker, max(data['robot_radii']) + 0.01,
+                                                data['obstacles'])
+    roadmap = Roadmap.from_edge_pairs(nodes, edges_pair)
+    return {name: getattr(roadmap, name) for name in ROADMAP_ARRAY_NAMES}
+
+
+def _run_batch_scenario(input_file, output_file, config, roadmap_specs):
+    """
+    Plan one scenario in a batch worker process on a roadmap shared by the parent.
+
+    :param input_file: Path to the input file.
+    :param output_file: Path to the output file.
+    :param config: Configuration dictionary.
+    :param roadmap_specs: Shared array specs of the Roadmap arrays, keyed by array name;
+                          None for planners that do not use a roadmap.
+    :return: Processing time of the scenario in seconds.
+    """
+    time_start = time.time()
+    if roadmap_specs is None:
+        run_scenario(input_file, output_file, config=config)
+        return time.time() - time_start
+
+    key = tuple(spec[0] for spec in roadmap_specs.values())
+    if key not in _batch_planners:
+        # The shared memory blocks stay attached for the lifetime of the worker.
+        attached = {name: attach_array(spec) for name, spec in roadmap_specs.items()}
+        roadmap = Roadmap(**{name: array for name, (_, array) in attached.items()})
+        _batch_planners[key] = (attached, PRM(None, None, roadmap=roadmap, config=config))
+
+    run_scenario(input_file, output_file, prm=_batch_planners[key][1], config=config)
+    return time.time() - time_start
+
+
+def run_batch(input_files, output_files, config_file="config.yaml", workers=1, config=None):
+    """
+    Run many scenarios on a process pool.
+
+    Scenarios with the same obstacles, robot radius and roadmap settings share one roadmap:
+    it is generated once, placed in shared memory and searched in place by the workers.
+    A failing scenario is logged and does not stop the others.
+
+    :param input_files: List of input file paths.
+    :param output_files: List of output file paths, one per input file.
+    :param config_file: Path to the configuration file.
+    :param workers: Number of worker processes.
+    :param config: Already loaded configuration; config_file is not read when given.
+    :return: List with the processing time of every scenario in seconds, None where it failed.
+    """
+    if config is None:
+        config = validate_config(load_config(config_file))
+    times = [None] * len(input_files)
+
+    groups = {}
+    for index, input_file in enumerate(input_files):
+        try:
+            groups.setdefault(scene_key(input_file, config), []).append(index)
+        except Exception as e:
+            logging.error(f"Scenario {input_file} failed: {e}")
+
+    builds = {}
+    if config['planner'] == 'prm':
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            builds = {key: pool.submit(_build_batch_roadmap, input_files[indices[0]], config)
+                      for key, indices in groups.items()}
+
+    # Share the roadmaps before the scenario workers are started, so they inherit the
+    # shared memory bookkeeping of this process.
+    blocks = []
+    roadmap_specs = {key: None for key in groups} if config['planner'] != 'prm' else {}
+    for key, build in builds.items():
+        try:
+            arrays = build.result()
+        except Exception as e:
+            for index in groups[key]:
+                logging.error(f"Scenario {input_files[index]} failed: roadmap generation failed: {e}")
+            continue
+
+        roadmap_specs[key] = {}
+        for name, array in arrays.items():
+            shm, roadmap_specs[key][name] = share_array(array)
+            blocks.append(shm)
+        logging.info(f"Generated roadmap with {len(arrays['nodes'])} nodes shared by {len(groups[key])} scenarios")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scenarios = {index: pool.submit(_run_batch_scenario, input_files[index], output_files[index],
+                                            config, specs)
+                         for key, specs in roadmap_specs.items() for index in groups[key]}
+
+            for index, scenario in sorted(scenarios.items()):
+                try:
+                    times[index] = scenario.result()
+                except Exception as e:
+                    logging.error(f"Scenario {input_files[index]} failed: {e}")
+    finally:
+        release_arrays(blocks)
+
+    failed = sum(elapsed is None for elapsed in times)
+    logging.info(f"Batch completed: {len(times) - failed} of {len(times)} scenarios succeeded")
+    return times
+
     
             
 
 if __name__ == "__main__":
     
+    setup_logging()
     config_file = "config.yaml"  # Path to the configuration file
-    config = load_config(config_file)  # Load the configuration
+    config_start = time.perf_counter()
+    config = validate_config(load_config(config_file))  # Load and check the configuration once
+    logging.info(f"Startup: imports took {IMPORT_SECONDS:.3f} seconds, "
+                 f"configuration parsing took {time.perf_counter() - config_start:.3f} seconds")
     time_list = []  # Initialize a list to store processing times
 
-    # Loop through each input file specified in the config
-    for i in range(len(config['input_file'])):
-        time_start = time.time()  # Record the start time
-        main(config['input_file'][i], config['output_file'][i])  # Call the main function with the current input and output file
-        time_end = time.time()  # Record the end time
-        time_list.append(time_end - time_start)  # Calculate and store the processing time
+    if config['batch_workers'] > 1:
+        time_list = [elapsed for elapsed in run_batch(config['input_file'], config['output_file'],
+                                                      config_file, config['batch_workers'], config=config)
+                     if elapsed is not None]
+    else:
+        # Loop through each input file specified in the config
+        for i in range(len(config['input_file'])):
+            time_start = time.time()  # Record the start time
+            main(config['input_file'][i], config['output_file'][i], config)  # Call the main function with the current input and output file
+            time_end = time.time()  # Record the end time
+            time_list.append(time_end - time_start)  # Calculate and store the processing time
 
     # Save the timing statistics to the specified output file
     save_statistics(time_list, config['time_output_file'])
-
-     
-
-
-
-
@@ -17,6 +17,116 @@ def load_config(config_file: str) -> dict:
         logging.error(f"Failed to load configuration file: {e}")
         raise
 
+# Expected type of every configuration key; a tuple allows several types.
+CONFIG_TYPES = {
+    'input_file': list,
+    'output_file': list,
+    'WORKSPACE_MIN': list,
+    'WORKSPACE_MAX': list,
+    'num_nodes': int,
+    'minimum_distance_between_nodes': (int, float),
+    'node_sampling': str,
+    'sampling_near_obstacles': bool,
+    'ratio_of_samples_near_obstacles': (int, float),
+    'visualize_obstacles': bool,
+    'visualize_nodes': bool,
+    'nearest_nodes': int,
+    'point_check_distance': (int, float),
+    'neighbour_index': str,
+    'edge_validation': str,
+    'edge_workers': int,
+    'visualize_road_map': bool,
+    'max_node_distance': (int, float),
+    'visualize_movement': bool,
+    'node_steps': (int, float),
+    'collision_backend': str,
+    'seed': int,
+    'roadmap_cache_dir': str,
+    'roadmap_cache_max_mb': (int, float),
+    'lazy_prm': bool,
+    'search_algorithm': str,
+    'attach_candidates': int,
+    'attach_planner': str,
+    'share_nodes_on_failure': bool,
+    'planner': str,
+    'rrt_step_size': (int, float),
+    'rrt_goal_bias': (int, float),
+    'rrt_max_iterations': int,
+    'rrt_batch_size': int,
+    'rrt_star_time_budget': (int, float),
+    'rrt_star_gamma': (int, float),
+    'shortcut_mode': str,
+    'shortcut_batch_size': int,
+    'shortcut_iterations': int,
+    'shortcut_time_budget': (int, float),
+    'roadmap_file': str,
+    'batch_workers': int,
+    'service_host': str,
+    'service_port': int,
+    'service_workers': int,
+    'output_format': str,
+    'time_output_file': str,
+}
+
+# Keys that may be null.
+CONFIG_NULLABLE = ('seed', 'roadmap_cache_dir', 'roadmap_file', 'rrt_star_time_budget', 'shortcut_time_budget')
+
+# Allowed values of the keys that select an implementation.
+CONFIG_CHOICES = {
+    'node_sampling': ('sequential', 'batched'),
+    'neighbour_index': ('brute', 'kdtree', 'grid'),
+    'edge_validation': ('sequential', 'batched', 'exact'),
+    'collision_backend': ('numpy', 'fcl'),
+    'search_algorithm': ('bfs', 'dijkstra', 'astar'),
+    'attach_planner': ('greedy', 'rrt', 'rrt_connect', 'rrt_star'),
+    'planner': ('prm', 'rrt', 'rrt_connect', 'rrt_star'),
+    'shortcut_mode': ('none', 'greedy', 'random', 'both'),
+    'output_format': ('auto', 'text', 'binary'),
+}
+
+
+def validate_config(config: dict) -> dict:
+    """
+    Check a loaded configuration once, so the modules it is passed to can index it directly.
+
+    :param config: Configuration dictionary returned by load_config.
+    :return: The same configuration dictionary.
+    :raises ValueError: If keys are missing or have invalid values; every problem is logged.
+    """
+    if not isinstance(config, dict):
+        raise ValueError("Configuration file must contain a mapping of settings.")
+
+    errors = []
+    for key, expected in CONFIG_TYPES.items():
+        if key not in config:
+            errors.append(f"missing key '{key}'")
+            continue
+        value = config[key]
+        if value is None and key in CONFIG_NULLABLE:
+            continue
+        # bool is a subclass of int, so numbers must not silently accept True/False.
+        if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+            errors.append(f"'{key}' has invalid value {value!r}")
+        elif key in CONFIG_CHOICES and value not in CONFIG_CHOICES[key]:
+            errors.append(f"'{key}' must be one of {', '.join(CONFIG_CHOICES[key])}, got '{value}'")
+
+    if isinstance(config.get('input_file'), list) and isinstance(config.get('output_file'), list) \
+            and len(config['input_file']) != len(config['output_file']):
+        errors.append("input_file and output_file must list the same number of files")
+
+    bounds = [config.get('WORKSPACE_MIN'), config.get('WORKSPACE_MAX')]
+    if all(isinstance(bound, list) for bound in bounds):
+        if any(len(bound) != 3 or not all(isinstance(v, (int, float)) for v in bound) for bound in bounds):
+            errors.append("WORKSPACE_MIN and WORKSPACE_MAX must hold three numbers each")
+        elif any(low >= high for low, high in zip(*bounds)):
+            errors.append("WORKSPACE_MIN must be smaller than WORKSPACE_MAX in every coordinate")
+
+    if errors:
+        for error in errors:
+            logging.error(f"Invalid configuration: {error}")
+        raise ValueError(f"Invalid configuration: {'; '.join(errors)}")
+    return config
+
 def setup_logging(log_level=logging.INFO):
     """
     Set up logging configuration.
@@ -30,7 +140,8 @@ def path_corrector(paths: List[List[Tuple]]) -> List[List[Tuple]]:
     """
     Corrects the paths by ensuring that consecutive points are not duplicated.
     
-    :param paths: List of paths, where each path is a list of line segments or points.
+    :param paths: List of paths, where each path is a list of line segments or points;
+                  None entries (robots without a path) are passed through.
     :return: List of corrected paths.
     """
     def _correct_path(path: List[Tuple]) -> List[Tuple]:
@@ -58,6 +169,6 @@ def path_corrector(paths: List[List[Tuple]]) -> List[List[Tuple]]:
 
         return corrected_path
 
-    corrected_paths = [ _correct_path(path) for path in paths ]
+    corrected_paths = [ _correct_path(path) if path is not None else None for path in paths ]
     return corrected_paths
 
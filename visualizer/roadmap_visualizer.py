@@ -41,7 +41,7 @@ class GraphVisualizer:
         for edge in self.edges:
             start_idx, end_idx = edge
             lines.append([start_idx, end_idx])
-        lines = np.array(lines)
+        lines = np.array(lines, dtype=np.int32).reshape(-1, 2)
 
         # Create line set for edges
         line_set = o3d.geometry.LineSet()
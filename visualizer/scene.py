@@ -2,22 +2,17 @@ import numpy as np
 import fcl
 import logging
 from map_generation.collision_detection import create_box, visualise_box, visualise, add_transform
-from utils import load_config, setup_logging
+from map_generation.collision_checker import CollisionChecker, cube_bounds
+from utils import load_config
 
-# Load configuration and logging
-config_file = "config.yaml"  
-config = load_config(config_file)
-setup_logging()
 
-WORKSPACE_MIN = np.array(config['WORKSPACE_MIN'])
-WORKSPACE_MAX = np.array(config['WORKSPACE_MAX'])
-
-
-def check_workspace_bounds(center, side_length):
+def check_workspace_bounds(center, side_length, workspace_min, workspace_max):
     """
     Check if the obstacle is within the defined workspace boundaries.
     :param center: Center of the obstacle (tuple of length 3).
     :param side_length: Side length of the cube obstacle (scalar).
+    :param workspace_min: Minimum workspace coordinates.
+    :param workspace_max: Maximum workspace coordinates.
     :return: Boolean indicating if the obstacle is within bounds.
     """
     # Convert center to a NumPy array for easier manipulation
@@ -31,7 +26,7 @@ def check_workspace_bounds(center, side_length):
     within_bounds = True
     
     for dim in range(3): 
-        if min_coord[dim] < WORKSPACE_MIN[dim] or max_coord[dim] > WORKSPACE_MAX[dim]:
+        if min_coord[dim] < workspace_min[dim] or max_coord[dim] > workspace_max[dim]:
             logging.error(
                 f"Obstacle at center {center} with side length {side_length} is out of bounds in dimension {dim}."
             )
@@ -41,33 +36,48 @@ def check_workspace_bounds(center, side_length):
     return within_bounds
 
 
-def create_scene(obstacle_data, visualize = False):
+def create_scene(obstacle_data, visualize = False, config=None):
     """
     Create a scene with obstacles based on the provided obstacle data.
-    :param obstacle_data: List of tuples containing obstacle center positions and side lengths.
-    :return: List of FCL CollisionObject instances representing obstacles.
+    :param obstacle_data: (M, 4) array or list of (center_x, center_y, center_z, side_length) obstacles.
+    :param visualize: Boolean flag indicating whether to show the obstacles.
+    :param config: Loaded configuration; config.yaml is read if None.
+    :return: List of FCL CollisionObject instances representing obstacles and a
+             CollisionChecker over them using the configured collision backend.
+             The FCL objects are only built for the 'fcl' backend or when visualizing;
+             the 'numpy' backend works on the cube array alone and the list is empty.
     """
-    obstacles = []
-    visual_objects = []
+    if config is None:
+        config = load_config("config.yaml")
+    workspace_min = np.array(config['WORKSPACE_MIN'])
+    workspace_max = np.array(config['WORKSPACE_MAX'])
+    obstacle_data = np.asarray(obstacle_data, dtype=float).reshape(-1, 4)
 
-   
+    # Bounds of all obstacles are tested at once; only the rejected ones are reported one by one.
+    box_min, box_max = cube_bounds(obstacle_data)
+    outside = np.any((box_min < workspace_min) | (box_max > workspace_max), axis=1)
+    for index in np.flatnonzero(outside):
+        check_workspace_bounds(obstacle_data[index, :3], obstacle_data[index, 3], workspace_min, workspace_max)
+    scene_cubes = obstacle_data[~outside]
 
-    for obstacle in obstacle_data:
-
-        center = obstacle[:3]
-        side_length = obstacle[3]
+    obstacles = []
+    visual_objects = []
 
-        if check_workspace_bounds(center, side_length):
+    if config['collision_backend'] != 'numpy' or visualize:
+        for center, side_length in zip(scene_cubes[:, :3], scene_cubes[:, 3]):
             box = create_box(side_length, side_length, side_length)
-            #box_trans = fcl.Transform(np.eye(3), center)
-            trans_box =  center
-            box_w_tf = add_transform(box, translation = trans_box )
-            obstacles.append(box_w_tf)
+            obstacles.append(add_transform(box, translation = center))
 
-            box_mesh = visualise_box(box, translation=center)
-            visual_objects.append(box_mesh)
+            if visualize:
+                box_mesh = visualise_box(box, translation=center)
+                visual_objects.append(box_mesh)
 
     if visualize:
         visualise(*visual_objects)
 
-    return obstacles
+    if config['collision_backend'] == 'numpy':
+        collision_checker = CollisionChecker.from_bounds(box_min[~outside], box_max[~outside])
+    else:
+        collision_checker = CollisionChecker(obstacles, scene_cubes, backend=config['collision_backend'])
+
+    return obstacles, collision_checker